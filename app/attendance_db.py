@@ -1,7 +1,13 @@
 from __future__ import annotations
-import mysql.connector, hashlib
-from typing import Tuple, List, Optional
+import hashlib, queue, threading, time
+from contextlib import contextmanager
+from collections import Counter
+from itertools import islice
+from typing import Callable, Iterable, Tuple, List, Optional
 from datetime import datetime, date
+from .config import DB_BACKEND, SQLITE_PATH, DB_POOL_SIZE, DB_POOL_RECYCLE, DB_POOL_TIMEOUT
+from .db_backend import get_backend
+from .metrics import timed
 
 DB_CONFIG = {
     'host': 'localhost',
@@ -10,316 +16,544 @@ DB_CONFIG = {
     'database': 'attendance'
 }
 
-DDL = [
-    """CREATE TABLE IF NOT EXISTS users (
-        person_id VARCHAR(255) PRIMARY KEY,
-        name VARCHAR(255) NOT NULL,
-        role ENUM('admin','student') NOT NULL,
-        password_hash VARCHAR(255) NOT NULL
-    )""",
-    """CREATE TABLE IF NOT EXISTS subjects (
-        subject_id VARCHAR(255) PRIMARY KEY,
-        name VARCHAR(255) NOT NULL
-    )""",
-    """CREATE TABLE IF NOT EXISTS attendance (
-        id INT AUTO_INCREMENT PRIMARY KEY,
-        person_id VARCHAR(255) NOT NULL,
-        subject_id VARCHAR(255) NOT NULL,
-        ts DATETIME NOT NULL,
-        day DATE NOT NULL,
-        UNIQUE KEY unique_attendance (person_id, subject_id, day),
-        FOREIGN KEY (person_id) REFERENCES users(person_id),
-        FOREIGN KEY (subject_id) REFERENCES subjects(subject_id)
-    )""",
-    """CREATE TABLE IF NOT EXISTS queries (
-        id INT AUTO_INCREMENT PRIMARY KEY,
-        person_id VARCHAR(255) NOT NULL,
-        query_text TEXT NOT NULL,
-        ts DATETIME NOT NULL,
-        status ENUM('pending','resolved') NOT NULL DEFAULT 'pending',
-        FOREIGN KEY (person_id) REFERENCES users(person_id)
-    )"""
-]
+BACKEND = get_backend(DB_BACKEND, DB_CONFIG, SQLITE_PATH)
+DDL = BACKEND.ddl
 
 def _hash(pwd: str) -> str:
     return hashlib.sha256(pwd.encode('utf-8')).hexdigest()
 
+class ConnectionPool:
+    """Fixed-size pool of open connections.
+
+    Callers wait when all ``size`` connections are checked out. Connections older than
+    ``recycle`` seconds are replaced, and ones idle for a while are pinged (and
+    reconnected if dead) before being handed out.
+    """
+
+    PING_AFTER_IDLE = 30.0
+
+    def __init__(self, connect, size: int = 5, recycle: float = 3600.0, timeout: float = 30.0, ping=None):
+        self._connect = connect
+        self._ping = ping or (lambda conn: conn.is_connected())
+        self.size, self.recycle, self.timeout = size, recycle, timeout
+        self._idle = queue.LifoQueue()   # (conn, created_at, last_used); most recently used first
+        self._lock = threading.Lock()
+        self._open = 0
+        self._stats = {'checkouts': 0, 'waits': 0, 'reconnects': 0, 'created': 0, 'discarded': 0}
+
+    def _create(self):
+        conn = self._connect()
+        with self._lock: self._stats['created'] += 1
+        return conn, time.monotonic()
+
+    def acquire(self):
+        try:
+            conn, created, last_used = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_open = self._open < self.size
+                if can_open: self._open += 1
+                else: self._stats['waits'] += 1
+            if can_open:
+                try:
+                    conn, created = self._create()
+                except Exception:
+                    with self._lock: self._open -= 1
+                    raise
+                last_used = time.monotonic()
+            else:
+                try:
+                    conn, created, last_used = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"No database connection free after {self.timeout}s") from None
+        now = time.monotonic()
+        stale = now - created > self.recycle
+        if not stale and now - last_used > self.PING_AFTER_IDLE:
+            try: stale = not self._ping(conn)
+            except Exception: stale = True
+        if stale:
+            try: conn.close()
+            except Exception: pass
+            try:
+                conn, created = self._create()
+            except Exception:
+                with self._lock: self._open -= 1
+                raise
+            with self._lock: self._stats['reconnects'] += 1
+        with self._lock: self._stats['checkouts'] += 1
+        return conn, created
+
+    def release(self, conn, created, broken: bool = False) -> None:
+        if broken:
+            try: conn.close()
+            except Exception: pass
+            with self._lock:
+                self._open -= 1; self._stats['discarded'] += 1
+            return
+        self._idle.put((conn, created, time.monotonic()))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, 'open': self._open, 'idle': self._idle.qsize(), 'size': self.size}
+
+    def close_all(self) -> None:
+        while True:
+            try: conn, _, _ = self._idle.get_nowait()
+            except queue.Empty: break
+            try: conn.close()
+            except Exception: pass
+            with self._lock: self._open -= 1
+
 def get_conn():
-    return mysql.connector.connect(**DB_CONFIG)
+    """A new unpooled connection; prefer ``session()``."""
+    return BACKEND.connect()
+
+_pool = ConnectionPool(get_conn, DB_POOL_SIZE, DB_POOL_RECYCLE, DB_POOL_TIMEOUT, ping=BACKEND.ping)
+
+def pool_stats() -> dict:
+    return _pool.stats()
 
+@contextmanager
+def session():
+    """Pooled cursor: commits on success, rolls back on error, then returns the connection to the pool."""
+    conn, created = _pool.acquire()
+    cursor = BACKEND.cursor(conn)
+    broken = False
+    try:
+        yield cursor
+        conn.commit()
+    except BaseException as e:
+        broken = isinstance(e, BACKEND.disconnect_errors)
+        if not broken:
+            try: conn.rollback()
+            except Exception: broken = True
+        raise
+    finally:
+        try: cursor.close()
+        except Exception: broken = True
+        _pool.release(conn, created, broken)
+
+@timed
 def init_db() -> None:
-    conn = get_conn()
-    cursor = conn.cursor()
-    for stmt in DDL:
+    with session() as cursor:
+        for stmt in DDL:
+            cursor.execute(stmt)
+    migrate()
+
+# Schema migrations, applied in version order and recorded in schema_version. Each must be
+# safe to re-run, since two processes may start at once and MySQL DDL cannot be rolled back.
+def _migrate_stats_tables(cursor) -> None:
+    for stmt in BACKEND.stats_ddl:
         cursor.execute(stmt)
-    conn.commit()
-    cursor.close()
-    conn.close()
+    _stats_rebuild(cursor)
+
+# (name, table, columns) serving the hot read queries
+READ_INDEXES = [
+    ("idx_attendance_ts", "attendance", "ts"),                         # list_attendance: ORDER BY ts DESC LIMIT
+    ("idx_attendance_subject_day", "attendance", "subject_id, day"),   # per-subject session days
+    ("idx_attendance_person_ts", "attendance", "person_id, ts"),       # list_attendance_by_person
+    ("idx_attendance_day", "attendance", "day"),                       # list_marked_on
+    ("idx_queries_ts", "queries", "ts"),                               # list_queries
+]
+
+def _migrate_read_indexes(cursor) -> None:
+    for name, table, cols in READ_INDEXES:
+        BACKEND.create_index(cursor, name, table, cols)
 
+MIGRATIONS = [
+    (1, "attendance statistics tables", _migrate_stats_tables),
+    (2, "read-path indexes", _migrate_read_indexes),
+]
+
+@timed
+def schema_version() -> int:
+    with session() as cursor:
+        cursor.execute("SELECT MAX(version) FROM schema_version")
+        (version,) = cursor.fetchone()
+    return version or 0
+
+@timed
+def migrate() -> List[int]:
+    """Apply pending migrations, each in its own transaction; returns the versions applied."""
+    with session() as cursor:
+        cursor.execute("SELECT version FROM schema_version")
+        done = {r[0] for r in cursor.fetchall()}
+    applied = []
+    for version, description, apply in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version in done: continue
+        with session() as cursor:
+            apply(cursor)
+            try:
+                cursor.execute("INSERT INTO schema_version(version, description, applied_at) VALUES (%s,%s,%s)",
+                               (version, description, datetime.now()))
+            except BACKEND.IntegrityError:
+                continue  # applied concurrently by another process
+        applied.append(version)
+    return applied
+
+@timed
 def ensure_default_admin() -> None:
-    conn = get_conn()
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM users WHERE role='admin'")
-    (n,) = cursor.fetchone()
-    if n == 0:
-        cursor.execute("INSERT INTO users(person_id, name, role, password_hash) VALUES (%s,%s,%s,%s)",
-                       ('admin','Administrator','admin', _hash('admin')))
-        conn.commit()
-    cursor.close()
-    conn.close()
+    with session() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM users WHERE role='admin'")
+        (n,) = cursor.fetchone()
+        if n == 0:
+            cursor.execute("INSERT INTO users(person_id, name, role, password_hash) VALUES (%s,%s,%s,%s)",
+                           ('admin','Administrator','admin', _hash('admin')))
 
 # Users / Students
+@timed
 def upsert_student(person_id: str, name: str, password: str = '1234') -> None:
-    conn = get_conn()
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO users(person_id, name, role, password_hash) VALUES (%s,%s,%s,%s) "
-        "ON DUPLICATE KEY UPDATE name=VALUES(name), role='student'",
-        (person_id, name, 'student', _hash(password))
-    )
-    conn.commit()
-    cursor.close()
-    conn.close()
+    with session() as cursor:
+        cursor.execute(
+            BACKEND.upsert("users", ("person_id", "name", "role", "password_hash"), "person_id",
+                           {"name": None, "role": "'student'"}),
+            (person_id, name, 'student', _hash(password))
+        )
 
+@timed
 def verify_login(person_id: str, password: str) -> Optional[tuple]:
-    conn = get_conn()
-    cursor = conn.cursor()
-    cursor.execute("SELECT person_id, name, role, password_hash FROM users WHERE person_id=%s", (person_id,))
-    row = cursor.fetchone()
-    cursor.close()
-    conn.close()
+    with session() as cursor:
+        cursor.execute("SELECT person_id, name, role, password_hash FROM users WHERE person_id=%s", (person_id,))
+        row = cursor.fetchone()
     if not row: return None
     if row[3] == _hash(password):
         return row[:3]  # person_id, name, role
     return None
 
 # Subjects
+@timed
 def add_subject(subject_id: str, name: str) -> None:
-    conn = get_conn()
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO subjects(subject_id, name) VALUES (%s,%s) ON DUPLICATE KEY UPDATE name=VALUES(name)", (subject_id, name))
-    conn.commit()
-    cursor.close()
-    conn.close()
+    with session() as cursor:
+        cursor.execute(BACKEND.upsert("subjects", ("subject_id", "name"), "subject_id", {"name": None}), (subject_id, name))
 
+@timed
 def list_subjects() -> List[tuple]:
-    conn = get_conn()
-    cursor = conn.cursor()
-    cursor.execute("SELECT subject_id, name FROM subjects ORDER BY subject_id")
-    rows = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return rows
+    with session() as cursor:
+        cursor.execute("SELECT subject_id, name FROM subjects ORDER BY subject_id")
+        return cursor.fetchall()
 
+@timed
 def list_students() -> List[tuple]:
-    conn = get_conn()
-    cursor = conn.cursor()
-    cursor.execute("SELECT person_id, name FROM users WHERE role='student' ORDER BY person_id")
-    rows = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return rows
+    with session() as cursor:
+        cursor.execute("SELECT person_id, name FROM users WHERE role='student' ORDER BY person_id")
+        return cursor.fetchall()
+
+# Attendance statistics: attendance_counts holds present days per (person, subject) and
+# subject_days the marks per (subject, day), so a subject's session days are its rows there.
+# Every write to attendance updates them in the same transaction.
+_ADD_COUNTS = BACKEND.upsert("attendance_counts", ("person_id", "subject_id", "present_days"), "person_id, subject_id",
+                             {"present_days": "present_days + {new}"})
+_ADD_DAYS = BACKEND.upsert("subject_days", ("subject_id", "day", "marks"), "subject_id, day", {"marks": "marks + {new}"})
+_SET_COUNTS = BACKEND.upsert("attendance_counts", ("person_id", "subject_id", "present_days"), "person_id, subject_id",
+                             {"present_days": None})
+_SET_DAYS = BACKEND.upsert("subject_days", ("subject_id", "day", "marks"), "subject_id, day", {"marks": None})
+
+def _stats_add(cursor, marks) -> None:
+    """Count newly inserted (person_id, subject_id, day) marks."""
+    pairs = Counter((p, s) for p, s, _ in marks)
+    days = Counter((s, d) for _, s, d in marks)
+    cursor.executemany(_ADD_COUNTS, [(p, s, n) for (p, s), n in pairs.items()])
+    cursor.executemany(_ADD_DAYS, [(s, d, n) for (s, d), n in days.items()])
+
+def _stats_remove(cursor, marks) -> None:
+    """Uncount deleted (person_id, subject_id, day) marks."""
+    for (p, s), n in Counter((p, s) for p, s, _ in marks).items():
+        cursor.execute("UPDATE attendance_counts SET present_days = present_days - %s WHERE person_id=%s AND subject_id=%s", (n, p, s))
+        cursor.execute("DELETE FROM attendance_counts WHERE person_id=%s AND subject_id=%s AND present_days <= 0", (p, s))
+    for (s, d), n in Counter((s, d) for _, s, d in marks).items():
+        cursor.execute("UPDATE subject_days SET marks = marks - %s WHERE subject_id=%s AND day=%s", (n, s, d))
+        cursor.execute("DELETE FROM subject_days WHERE subject_id=%s AND day=%s AND marks <= 0", (s, d))
+
+def _stats_recount(cursor, marks) -> None:
+    """Recount the keys touched by ``marks`` from attendance, for inserts where some rows were ignored."""
+    for p, s in {(p, s) for p, s, _ in marks}:
+        cursor.execute("SELECT COUNT(*) FROM attendance WHERE person_id=%s AND subject_id=%s", (p, s))
+        (n,) = cursor.fetchone()
+        cursor.execute(_SET_COUNTS, (p, s, n))
+    for s, d in {(s, d) for _, s, d in marks}:
+        cursor.execute("SELECT COUNT(*) FROM attendance WHERE subject_id=%s AND day=%s", (s, d))
+        (n,) = cursor.fetchone()
+        cursor.execute(_SET_DAYS, (s, d, n))
+
+def _stats_rebuild(cursor) -> None:
+    cursor.execute("DELETE FROM attendance_counts")
+    cursor.execute("DELETE FROM subject_days")
+    cursor.execute("INSERT INTO attendance_counts(person_id, subject_id, present_days) "
+                   "SELECT person_id, subject_id, COUNT(*) FROM attendance GROUP BY person_id, subject_id")
+    cursor.execute("INSERT INTO subject_days(subject_id, day, marks) "
+                   "SELECT subject_id, day, COUNT(*) FROM attendance GROUP BY subject_id, day")
+
+@timed
+def rebuild_attendance_stats() -> None:
+    """Recompute the statistics tables from attendance."""
+    with session() as cursor:
+        _stats_rebuild(cursor)
+
+@timed
+def verify_attendance_stats() -> List[str]:
+    """Differences between the statistics tables and attendance; empty when they agree."""
+    with session() as cursor:
+        cursor.execute("SELECT person_id, subject_id, COUNT(*) FROM attendance GROUP BY person_id, subject_id")
+        want_counts = {(p, s): n for p, s, n in cursor.fetchall()}
+        cursor.execute("SELECT person_id, subject_id, present_days FROM attendance_counts")
+        have_counts = {(p, s): n for p, s, n in cursor.fetchall()}
+        cursor.execute("SELECT subject_id, day, COUNT(*) FROM attendance GROUP BY subject_id, day")
+        want_days = {(s, d): n for s, d, n in cursor.fetchall()}
+        cursor.execute("SELECT subject_id, day, marks FROM subject_days")
+        have_days = {(s, d): n for s, d, n in cursor.fetchall()}
+    problems = []
+    for key in sorted(want_counts.keys() | have_counts.keys()):
+        if want_counts.get(key, 0) != have_counts.get(key, 0):
+            problems.append(f"present_days {key[0]}/{key[1]}: {have_counts.get(key, 0)}, expected {want_counts.get(key, 0)}")
+    for key in sorted(want_days.keys() | have_days.keys(), key=str):
+        if want_days.get(key, 0) != have_days.get(key, 0):
+            problems.append(f"marks {key[0]} on {key[1]}: {have_days.get(key, 0)}, expected {want_days.get(key, 0)}")
+    return problems
 
 # Attendance
+@timed
 def mark_attendance(person_id: str, subject_id: str) -> Tuple[bool, str]:
     today = date.today()
     now = datetime.now()
-    conn = get_conn()
-    cursor = conn.cursor()
-    try:
-        cursor.execute("INSERT INTO attendance(person_id, subject_id, ts, day) VALUES (%s,%s,%s,%s)",
-                       (person_id, subject_id, now, today))
-        conn.commit()
-        cursor.close()
-        conn.close()
-        return True, f"Marked at {now.isoformat()}"
-    except mysql.connector.errors.IntegrityError:
-        cursor.execute("SELECT ts FROM attendance WHERE person_id=%s AND subject_id=%s AND day=%s",
-                       (person_id, subject_id, today))
-        row = cursor.fetchone()
-        ts = row[0] if row else now
-        cursor.close()
-        conn.close()
-        return False, f"Already marked today at {ts}"
+    with session() as cursor:
+        try:
+            cursor.execute("INSERT INTO attendance(person_id, subject_id, ts, day) VALUES (%s,%s,%s,%s)",
+                           (person_id, subject_id, now, today))
+            _stats_add(cursor, [(person_id, subject_id, today)])
+            return True, f"Marked at {now.isoformat()}"
+        except BACKEND.IntegrityError:
+            cursor.execute("SELECT ts FROM attendance WHERE person_id=%s AND subject_id=%s AND day=%s",
+                           (person_id, subject_id, today))
+            row = cursor.fetchone()
+    ts = row[0] if row else now
+    return False, f"Already marked today at {ts}"
+
+@timed
+def list_marked_on(day: date) -> List[tuple]:
+    """(person_id, subject_id, ts) of every mark on ``day``."""
+    with session() as cursor:
+        cursor.execute("SELECT person_id, subject_id, ts FROM attendance WHERE day=%s", (day,))
+        return cursor.fetchall()
+
+@timed
+def known_ids() -> Tuple[set, set]:
+    """(person_ids, subject_ids) that attendance rows can refer to."""
+    with session() as cursor:
+        cursor.execute("SELECT person_id FROM users")
+        people = {r[0] for r in cursor.fetchall()}
+        cursor.execute("SELECT subject_id FROM subjects")
+        return people, {r[0] for r in cursor.fetchall()}
 
+def _existing(cursor, table: str, column: str, values) -> set:
+    values = sorted(set(values))
+    cursor.execute(f"SELECT {column} FROM {table} WHERE {column} IN ({','.join(['%s'] * len(values))})", values)
+    return {r[0] for r in cursor.fetchall()}
+
+@timed
+def insert_attendance_batch(rows: List[Tuple[str, str, datetime]]) -> int:
+    """Insert (person_id, subject_id, ts) marks in one multi-row statement, skipping ones already present.
+    Marks for an unknown student or subject are reported and dropped: they can never be inserted,
+    and SQLite's INSERT OR IGNORE would fail the whole statement on them. Returns the number of rows inserted."""
+    if not rows: return 0
+    with session() as cursor:
+        people = _existing(cursor, "users", "person_id", [r[0] for r in rows])
+        subjects = _existing(cursor, "subjects", "subject_id", [r[1] for r in rows])
+        for person_id, subject_id, ts in rows:
+            if person_id not in people or subject_id not in subjects:
+                what = "student" if person_id not in people else "subject"
+                print(f"[SKIP] Mark {person_id}/{subject_id} at {ts}: unknown {what}")
+        rows = [r for r in rows if r[0] in people and r[1] in subjects]
+        if not rows: return 0
+        marks = [(person_id, subject_id, ts.date()) for person_id, subject_id, ts in rows]
+        cursor.execute(
+            "INSERT IGNORE INTO attendance(person_id, subject_id, ts, day) VALUES " + ",".join(["(%s,%s,%s,%s)"] * len(rows)),
+            [v for (person_id, subject_id, ts), (_, _, day) in zip(rows, marks) for v in (person_id, subject_id, ts, day)]
+        )
+        inserted = cursor.rowcount
+        if inserted == len(rows): _stats_add(cursor, marks)
+        elif inserted: _stats_recount(cursor, marks)
+        return inserted
+
+@timed
 def list_attendance(limit: int = 200) -> List[tuple]:
-    conn = get_conn()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT a.id, a.person_id, u.name, a.subject_id, s.name, a.ts, a.day "
-        "FROM attendance a "
-        "JOIN users u ON a.person_id=u.person_id "
-        "JOIN subjects s ON a.subject_id=s.subject_id "
-        "ORDER BY a.ts DESC LIMIT %s", (limit,)
-    )
-    rows = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return rows
+    with session() as cursor:
+        cursor.execute(
+            "SELECT a.id, a.person_id, u.name, a.subject_id, s.name, a.ts, a.day "
+            "FROM attendance a "
+            "JOIN users u ON a.person_id=u.person_id "
+            "JOIN subjects s ON a.subject_id=s.subject_id "
+            "ORDER BY a.ts DESC LIMIT %s", (limit,)
+        )
+        return cursor.fetchall()
 
+@timed
+def list_attendance_page(after_id: Optional[int] = None, before_id: Optional[int] = None, limit: int = 200) -> List[tuple]:
+    """Keyset page of list_attendance() rows, newest id first: ids above after_id and/or below before_id."""
+    where, params = [], []
+    if after_id is not None:
+        where.append("a.id > %s"); params.append(after_id)
+    if before_id is not None:
+        where.append("a.id < %s"); params.append(before_id)
+    with session() as cursor:
+        cursor.execute(
+            "SELECT a.id, a.person_id, u.name, a.subject_id, s.name, a.ts, a.day "
+            "FROM attendance a "
+            "JOIN users u ON a.person_id=u.person_id "
+            "JOIN subjects s ON a.subject_id=s.subject_id "
+            + ("WHERE " + " AND ".join(where) + " " if where else "") +
+            "ORDER BY a.id DESC LIMIT %s", (*params, limit)
+        )
+        return cursor.fetchall()
+
+@timed
 def list_attendance_by_person(person_id: str) -> List[tuple]:
-    conn = get_conn()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT a.subject_id, s.name, a.ts, a.day "
-        "FROM attendance a JOIN subjects s ON a.subject_id=s.subject_id "
-        "WHERE a.person_id=%s ORDER BY a.ts DESC", (person_id,)
-    )
-    rows = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return rows
+    with session() as cursor:
+        cursor.execute(
+            "SELECT a.subject_id, s.name, a.ts, a.day "
+            "FROM attendance a JOIN subjects s ON a.subject_id=s.subject_id "
+            "WHERE a.person_id=%s ORDER BY a.ts DESC", (person_id,)
+        )
+        return cursor.fetchall()
 
 # Queries
+@timed
 def insert_query(person_id: str, query_text: str) -> None:
     now = datetime.now()
-    conn = get_conn()
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO queries(person_id, query_text, ts, status) VALUES (%s,%s,%s,%s)",
-                   (person_id, query_text, now, 'pending'))
-    conn.commit()
-    cursor.close()
-    conn.close()
+    with session() as cursor:
+        cursor.execute("INSERT INTO queries(person_id, query_text, ts, status) VALUES (%s,%s,%s,%s)",
+                       (person_id, query_text, now, 'pending'))
 
+@timed
 def list_queries() -> List[tuple]:
-    conn = get_conn()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT q.id, q.person_id, u.name, q.query_text, q.ts, q.status "
-        "FROM queries q JOIN users u ON q.person_id=u.person_id "
-        "ORDER BY q.ts DESC"
-    )
-    rows = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return rows
+    with session() as cursor:
+        cursor.execute(
+            "SELECT q.id, q.person_id, u.name, q.query_text, q.ts, q.status "
+            "FROM queries q JOIN users u ON q.person_id=u.person_id "
+            "ORDER BY q.ts DESC"
+        )
+        return cursor.fetchall()
 
+@timed
 def update_query_status(query_id: int, status: str) -> None:
-    conn = get_conn()
-    cursor = conn.cursor()
-    cursor.execute("UPDATE queries SET status=%s WHERE id=%s", (status, query_id))
-    conn.commit()
-    cursor.close()
-    conn.close()
+    with session() as cursor:
+        cursor.execute("UPDATE queries SET status=%s WHERE id=%s", (status, query_id))
 
 # Profile
+@timed
 def update_student(person_id: str, name: str) -> None:
-    conn = get_conn()
-    cursor = conn.cursor()
-    cursor.execute("UPDATE users SET name=%s WHERE person_id=%s", (name, person_id))
-    conn.commit()
-    cursor.close()
-    conn.close()
+    with session() as cursor:
+        cursor.execute("UPDATE users SET name=%s WHERE person_id=%s", (name, person_id))
 
 # Attendance Summary
+@timed
 def get_attendance_summary(person_id: str) -> List[tuple]:
-    conn = get_conn()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT s.subject_id, s.name, COUNT(a.id) as attendance_count "
-        "FROM subjects s LEFT JOIN attendance a ON s.subject_id=a.subject_id AND a.person_id=%s "
-        "GROUP BY s.subject_id, s.name ORDER BY s.subject_id", (person_id,)
-    )
-    rows = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return rows
+    with session() as cursor:
+        cursor.execute(
+            "SELECT s.subject_id, s.name, COUNT(a.id) as attendance_count "
+            "FROM subjects s LEFT JOIN attendance a ON s.subject_id=a.subject_id AND a.person_id=%s "
+            "GROUP BY s.subject_id, s.name ORDER BY s.subject_id", (person_id,)
+        )
+        return cursor.fetchall()
 
+@timed
 def update_attendance_status(attendance_id: int, new_status: str) -> None:
     """Update or delete attendance record. If new_status is 'absent', delete the record."""
-    conn = get_conn()
-    cursor = conn.cursor()
-    if new_status.lower() == 'absent':
-        cursor.execute("DELETE FROM attendance WHERE id=%s", (attendance_id,))
-    conn.commit()
-    cursor.close()
-    conn.close()
+    with session() as cursor:
+        if new_status.lower() == 'absent':
+            cursor.execute("SELECT person_id, subject_id, day FROM attendance WHERE id=%s", (attendance_id,))
+            row = cursor.fetchone()
+            cursor.execute("DELETE FROM attendance WHERE id=%s", (attendance_id,))
+            if row and cursor.rowcount: _stats_remove(cursor, [row])
 
+@timed
 def add_manual_attendance(person_id: str, subject_id: str, attendance_date: date) -> Tuple[bool, str]:
     """Manually add attendance for a specific date"""
     now = datetime.now()
-    conn = get_conn()
-    cursor = conn.cursor()
-    try:
-        cursor.execute("INSERT INTO attendance(person_id, subject_id, ts, day) VALUES (%s,%s,%s,%s)",
-                       (person_id, subject_id, now, attendance_date))
-        conn.commit()
-        cursor.close()
-        conn.close()
-        return True, "Attendance added successfully"
-    except mysql.connector.errors.IntegrityError:
-        cursor.close()
-        conn.close()
-        return False, "Attendance already exists for this date"
+    with session() as cursor:
+        try:
+            cursor.execute("INSERT INTO attendance(person_id, subject_id, ts, day) VALUES (%s,%s,%s,%s)",
+                           (person_id, subject_id, now, attendance_date))
+            _stats_add(cursor, [(person_id, subject_id, attendance_date)])
+            return True, "Attendance added successfully"
+        except BACKEND.IntegrityError:
+            return False, "Attendance already exists for this date"
 
+@timed
 def get_detailed_attendance_stats(person_id: str = None) -> List[tuple]:
     """Get detailed attendance statistics with total days and percentage"""
-    conn = get_conn()
-    cursor = conn.cursor()
-    
-    if person_id:
-        # For specific student
-        cursor.execute("""
-            SELECT 
-                u.person_id,
-                u.name,
-                s.subject_id,
-                s.name as subject_name,
-                COUNT(a.id) as present_days,
-                (SELECT COUNT(DISTINCT day) FROM attendance WHERE subject_id = s.subject_id) as total_days
-            FROM users u
-            CROSS JOIN subjects s
-            LEFT JOIN attendance a ON u.person_id = a.person_id AND s.subject_id = a.subject_id
-            WHERE u.person_id = %s AND u.role = 'student'
-            GROUP BY u.person_id, u.name, s.subject_id, s.name
-            ORDER BY s.subject_id
-        """, (person_id,))
-    else:
-        # For all students
-        cursor.execute("""
-            SELECT 
-                u.person_id,
-                u.name,
-                s.subject_id,
-                s.name as subject_name,
-                COUNT(a.id) as present_days,
-                (SELECT COUNT(DISTINCT day) FROM attendance WHERE subject_id = s.subject_id) as total_days
-            FROM users u
-            CROSS JOIN subjects s
-            LEFT JOIN attendance a ON u.person_id = a.person_id AND s.subject_id = a.subject_id
-            WHERE u.role = 'student'
-            GROUP BY u.person_id, u.name, s.subject_id, s.name
-            ORDER BY u.person_id, s.subject_id
-        """)
-    
-    rows = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return rows
-
-def bulk_import_attendance(attendance_records: List[Tuple[str, str, date]]) -> Tuple[int, int, List[str]]:
+    # Read from the summary tables; subject_days is small (one row per subject per session day)
+    query = """
+        SELECT 
+            u.person_id,
+            u.name,
+            s.subject_id,
+            s.name as subject_name,
+            COALESCE(c.present_days, 0) as present_days,
+            COALESCE(t.total_days, 0) as total_days
+        FROM users u
+        CROSS JOIN subjects s
+        LEFT JOIN attendance_counts c ON c.person_id = u.person_id AND c.subject_id = s.subject_id
+        LEFT JOIN (SELECT subject_id, COUNT(*) as total_days FROM subject_days GROUP BY subject_id) t
+            ON t.subject_id = s.subject_id
     """
-    Bulk import attendance records
+    with session() as cursor:
+        if person_id:
+            # For specific student
+            cursor.execute(query + "WHERE u.person_id = %s AND u.role = 'student' ORDER BY s.subject_id", (person_id,))
+        else:
+            # For all students
+            cursor.execute(query + "WHERE u.role = 'student' ORDER BY u.person_id, s.subject_id")
+        return cursor.fetchall()
+
+@timed
+def bulk_import_attendance(attendance_records: Iterable[Tuple[str, str, date]], chunk_size: int = 1000,
+                           on_chunk: Optional[Callable[[int, int, int], None]] = None) -> Tuple[int, int, List[str]]:
+    """
+    Bulk import attendance records, inserting ``chunk_size`` records per transaction
+    on_chunk(success, duplicates, errors) is called with running totals after each chunk.
     Returns: (success_count, duplicate_count, error_messages)
     """
-    conn = get_conn()
-    cursor = conn.cursor()
     success = 0
     duplicates = 0
     errors = []
-    
-    for person_id, subject_id, attendance_date in attendance_records:
+
+    # Unknown ids would fail the foreign keys; report them instead of sending them
+    with session() as cursor:
+        cursor.execute("SELECT person_id FROM users")
+        people = {r[0] for r in cursor.fetchall()}
+        cursor.execute("SELECT subject_id FROM subjects")
+        subjects = {r[0] for r in cursor.fetchall()}
+
+    sql = "INSERT IGNORE INTO attendance(person_id, subject_id, ts, day) VALUES (%s,%s,%s,%s)"
+    records = iter(attendance_records)
+    while True:
+        batch = list(islice(records, chunk_size))
+        if not batch: break
+        chunk = []
+        now = datetime.now()
+        for person_id, subject_id, attendance_date in batch:
+            if person_id not in people:
+                errors.append(f"Error for {person_id}/{subject_id}/{attendance_date}: unknown student")
+            elif subject_id not in subjects:
+                errors.append(f"Error for {person_id}/{subject_id}/{attendance_date}: unknown subject")
+            else:
+                chunk.append((person_id, subject_id, now, attendance_date))
+        if not chunk:
+            if on_chunk: on_chunk(success, duplicates, len(errors))
+            continue
         try:
-            now = datetime.now()
-            cursor.execute("INSERT INTO attendance(person_id, subject_id, ts, day) VALUES (%s,%s,%s,%s)",
-                          (person_id, subject_id, now, attendance_date))
-            conn.commit()
-            success += 1
-        except mysql.connector.errors.IntegrityError:
-            duplicates += 1
+            with session() as cursor:
+                cursor.executemany(sql, chunk)
+                inserted = cursor.rowcount
+                marks = [(p, s, d) for p, s, _, d in chunk]
+                if inserted == len(chunk): _stats_add(cursor, marks)
+                elif inserted: _stats_recount(cursor, marks)
         except Exception as e:
-            errors.append(f"Error for {person_id}/{subject_id}/{attendance_date}: {str(e)}")
-    
-    cursor.close()
-    conn.close()
+            errors.append(f"Error for {len(chunk)} records from {chunk[0][0]}/{chunk[0][1]}/{chunk[0][3]}: {str(e)}")
+        else:
+            # Ignored rows (already present, or repeated within the import) are the duplicates
+            success += inserted
+            duplicates += len(chunk) - inserted
+        if on_chunk: on_chunk(success, duplicates, len(errors))
+
     return success, duplicates, errors
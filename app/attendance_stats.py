@@ -0,0 +1,22 @@
+import argparse, sys
+from .attendance_db import init_db, rebuild_attendance_stats, verify_attendance_stats
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Check or rebuild the attendance statistics tables")
+    p.add_argument("--rebuild", action="store_true", help="Recompute the statistics from the attendance table")
+    args = p.parse_args(argv)
+
+    init_db()
+    if args.rebuild:
+        rebuild_attendance_stats()
+        print("[OK] Attendance statistics rebuilt")
+    problems = verify_attendance_stats()
+    for msg in problems[:50]:
+        print(f"[ERROR] {msg}")
+    if problems:
+        print(f"[ERROR] {len(problems)} mismatch(es); run with --rebuild to fix")
+        sys.exit(1)
+    print("[OK] Attendance statistics match the attendance table")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+from __future__ import annotations
+import json, os, threading, time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+from .config import BASE_DATA_DIR
+from .attendance_db import known_ids, list_marked_on, insert_attendance_batch
+from .metrics import timed
+
+PENDING_MARKS = BASE_DATA_DIR / "pending_marks.jsonl"
+
+class AttendanceWriter:
+    """Write-behind attendance marking for the live recognizer.
+
+    Today's marks are loaded once, so repeat sightings are answered from memory. New
+    marks are appended to a journal file before ``mark`` returns and are inserted in
+    batches by a background thread; the journal only forgets a mark once the database
+    has it. Marks still pending at exit or after a DB error are retried on the next
+    flush or the next start. Marks for unknown students or subjects are refused up front
+    (the known ids are reloaded at most every ``ids_ttl`` seconds when one is missing).
+    """
+
+    def __init__(self, journal: Path = PENDING_MARKS, flush_interval: float = 1.0, batch_size: int = 200,
+                 on_flush: Callable[[int], None] = None, load_marks=list_marked_on, insert=insert_attendance_batch,
+                 load_ids=known_ids, ids_ttl: float = 5.0):
+        self.journal = Path(journal)
+        self.flush_interval, self.batch_size = flush_interval, batch_size
+        self.on_flush = on_flush
+        self._load_marks, self._insert, self._load_ids = load_marks, insert, load_ids
+        self.ids_ttl = ids_ttl
+        self._people, self._subjects, self._ids_at = set(), set(), None
+        self._marked: Dict[Tuple[str, str], datetime] = {}
+        self._pending: List[Tuple[str, str, datetime]] = []
+        self._day = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="attendance-writer", daemon=True)
+
+    def start(self) -> "AttendanceWriter":
+        self._reload(date.today())
+        for person_id, subject_id, ts in self._read_journal():
+            self._pending.append((person_id, subject_id, ts))
+            if ts.date() == self._day: self._marked.setdefault((person_id, subject_id), ts)
+        if self._pending: print(f"[INFO] Retrying {len(self._pending)} pending mark(s) from last run")
+        self._thread.start()
+        return self
+
+    def _known(self, person_id: str, subject_id: str) -> str:
+        """"" if both ids exist, else what is unknown; call with the lock held."""
+        if person_id not in self._people: return f"Unknown student {person_id}"
+        if subject_id not in self._subjects: return f"Unknown subject {subject_id}"
+        return ""
+
+    def _reload_ids(self) -> None:
+        people, subjects = self._load_ids()  # outside the lock: marks for known ids go on meanwhile
+        with self._lock:
+            self._people, self._subjects, self._ids_at = people, subjects, time.monotonic()
+
+    def _reload(self, day: date) -> None:
+        marked = {(p, s): ts for p, s, ts in self._load_marks(day)}
+        with self._lock:
+            if self._day != day:  # another thread may have swapped the day in already
+                self._day, self._marked = day, marked
+
+    @timed(name="writer.mark")
+    def mark(self, person_id: str, subject_id: str) -> Tuple[bool, str]:
+        """Same contract as ``attendance_db.mark_attendance``; returns without waiting for the database."""
+        now = datetime.now()
+        if now.date() != self._day:
+            self._reload(now.date())
+        for retry in (False, True):
+            with self._lock:
+                ts = self._marked.get((person_id, subject_id))
+                if ts is not None:
+                    return False, f"Already marked today at {ts.strftime('%H:%M:%S')}"
+                unknown = self._known(person_id, subject_id)
+                if not unknown:
+                    self._marked[(person_id, subject_id)] = now
+                    self._pending.append((person_id, subject_id, now))
+                    with open(self.journal, "a", encoding="utf-8") as f:
+                        f.write(json.dumps({"person_id": person_id, "subject_id": subject_id, "ts": now.isoformat()}) + "\n")
+                        f.flush(); os.fsync(f.fileno())
+                    if len(self._pending) >= self.batch_size: self._wake.set()
+                    return True, f"Marked at {now.isoformat()}"
+                if retry or (self._ids_at is not None and time.monotonic() - self._ids_at < self.ids_ttl):
+                    return False, unknown
+            self._reload_ids()
+
+    def _read_journal(self):
+        try:
+            with open(self.journal, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return []
+        rows = []
+        for line in lines:
+            try:
+                rec = json.loads(line)
+                rows.append((rec["person_id"], rec["subject_id"], datetime.fromisoformat(rec["ts"])))
+            except (ValueError, KeyError):
+                continue  # torn last line from a crash mid-write
+        return rows
+
+    def _rewrite_journal(self) -> None:
+        tmp = self.journal.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for person_id, subject_id, ts in self._pending:
+                f.write(json.dumps({"person_id": person_id, "subject_id": subject_id, "ts": ts.isoformat()}) + "\n")
+            f.flush(); os.fsync(f.fileno())
+        os.replace(tmp, self.journal)
+
+    @timed(name="writer.flush")
+    def flush(self) -> int:
+        """Insert pending marks; returns how many were new to the database. Raises on DB error."""
+        with self._lock:
+            batch = list(self._pending)
+        if not batch: return 0
+        inserted = 0
+        for i in range(0, len(batch), self.batch_size):
+            inserted += self._insert(batch[i:i + self.batch_size])
+        with self._lock:
+            done = set(batch)
+            self._pending = [m for m in self._pending if m not in done]
+            self._rewrite_journal()
+        if inserted and self.on_flush: self.on_flush(inserted)
+        return inserted
+
+    def _run(self) -> None:
+        backoff = self.flush_interval
+        while not self._stop.is_set():
+            self._wake.wait(backoff)
+            self._wake.clear()
+            try:
+                self.flush()
+                backoff = self.flush_interval
+            except Exception as e:
+                backoff = min(backoff * 2, 30.0)
+                print(f"[ERROR] Attendance flush failed, retrying in {backoff:.1f}s: {e}")
+
+    def close(self) -> None:
+        """Stop the flusher and try a last flush; anything still pending stays in the journal."""
+        self._stop.set(); self._wake.set()
+        if self._thread.is_alive(): self._thread.join()
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"[ERROR] {len(self._pending)} mark(s) left in {self.journal} for the next run: {e}")
@@ -1,34 +1,256 @@
-import mysql.connector, pandas as pd
-from .attendance_db import DB_CONFIG
-from .config import AUTO_EXPORT_MASTER, AUTO_EXPORT_DAILY
-
-def export_master():
-    conn = mysql.connector.connect(**DB_CONFIG)
-    df = pd.read_sql_query(
-        """
-        SELECT a.id, a.person_id, u.name AS person_name, a.subject_id, s.name AS subject_name, DATE_FORMAT(a.ts, '%Y-%m-%d %H:%i:%s') AS ts, DATE_FORMAT(a.day, '%Y-%m-%d') AS day
-        FROM attendance a
-        JOIN users u ON a.person_id = u.person_id
-        JOIN subjects s ON a.subject_id = s.subject_id
-        ORDER BY a.ts DESC
-        """, conn)
-    df.to_csv(str(AUTO_EXPORT_MASTER), index=False)
-    conn.close()
-
-def export_daily():
-    conn = mysql.connector.connect(**DB_CONFIG)
-    df = pd.read_sql_query(
-        """
-        SELECT a.person_id, u.name AS person_name, a.subject_id, s.name AS subject_name, DATE_FORMAT(a.day, '%Y-%m-%d') AS day, DATE_FORMAT(MIN(a.ts), '%Y-%m-%d %H:%i:%s') AS first_mark
-        FROM attendance a
-        JOIN users u ON a.person_id = u.person_id
-        JOIN subjects s ON a.subject_id = s.subject_id
-        GROUP BY a.person_id, a.subject_id, a.day
-        ORDER BY a.day DESC, a.person_id
-        """, conn)
-    df.to_csv(str(AUTO_EXPORT_DAILY), index=False)
-    conn.close()
+import csv, io, json, os, threading
+from contextlib import contextmanager
+from .attendance_db import session
+from .config import AUTO_EXPORT_MASTER, AUTO_EXPORT_DAILY, BASE_DATA_DIR
+from .metrics import timed
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
+# Per-file export progress: the last attendance.id, the ids still missing below it (see RESCAN_IDS)
+# and synced size of each CSV, plus where each day starts in the daily one
+EXPORT_STATE = BASE_DATA_DIR / 'export_state.json'
+# Exports run in the GUI process (after edits) and in the worker's live loop: this file serializes them
+EXPORT_LOCK = BASE_DATA_DIR / 'export_state.lock'
+# Ids are handed out at insert but become visible at commit, so on MySQL a transaction still open
+# (a bulk import chunk) can commit ids below ones already exported. Ids missing from a file this
+# close under its last id are looked for again on each export.
+RESCAN_IDS = 5000
+MASTER_COLUMNS = ["id", "person_id", "person_name", "subject_id", "subject_name", "ts", "day"]
+_lock = threading.Lock()  # flock does not exclude threads sharing one process's lock file
+DAILY_COLUMNS = ["person_id", "person_name", "subject_id", "subject_name", "day", "first_mark"]
+
+def _fmt(value, fmt):
+    return value.strftime(fmt) if hasattr(value, "strftime") else str(value)
+
+def fetch_rows_since(last_id: int):
+    """Master rows with attendance.id > last_id, in id order, with ts/day formatted as in the CSVs."""
+    with session() as cursor:
+        cursor.execute(
+            "SELECT a.id, a.person_id, u.name, a.subject_id, s.name, a.ts, a.day "
+            "FROM attendance a "
+            "JOIN users u ON a.person_id = u.person_id "
+            "JOIN subjects s ON a.subject_id = s.subject_id "
+            "WHERE a.id > %s ORDER BY a.id", (last_id,)
+        )
+        fetched = cursor.fetchall()
+    return [[i, pid, pname, sid, sname, _fmt(ts, '%Y-%m-%d %H:%M:%S'), _fmt(day, '%Y-%m-%d')]
+            for i, pid, pname, sid, sname, ts, day in fetched]
+
+def fetch_daily_since(day=None):
+    """Daily rows for ``day`` and later (every day when None), by day then person and subject.
+    attendance is UNIQUE per (person, subject, day), so each row is its key's first mark."""
+    where, params = ("WHERE a.day >= %s ", (day,)) if day else ("", ())
+    with session() as cursor:
+        cursor.execute(
+            "SELECT a.person_id, u.name, a.subject_id, s.name, a.day, a.ts "
+            "FROM attendance a "
+            "JOIN users u ON a.person_id = u.person_id "
+            "JOIN subjects s ON a.subject_id = s.subject_id " + where +
+            "ORDER BY a.day, a.person_id, a.subject_id", params
+        )
+        fetched = cursor.fetchall()
+    return [[pid, pname, sid, sname, _fmt(d, '%Y-%m-%d'), _fmt(ts, '%Y-%m-%d %H:%M:%S')]
+            for pid, pname, sid, sname, d, ts in fetched]
+
+def _ids_since(last_id: int, with_day: bool = False):
+    """Ids (or (id, day) pairs, day as stored) of attendance rows with id > last_id, in id order."""
+    with session() as cursor:
+        cursor.execute(f"SELECT id{', day' if with_day else ''} FROM attendance WHERE id > %s ORDER BY id", (last_id,))
+        fetched = cursor.fetchall()
+    return fetched if with_day else [r[0] for r in fetched]
+
+def _low(section) -> int:
+    """Rows above this id may be missing from the file: its oldest gap, or else its last id."""
+    gaps = section.get('gaps')
+    return min(gaps) - 1 if gaps else section['last_id']
+
+def _advance(section, ids):
+    """Of the ``ids`` fetched from ``_low(section)`` on, the ones not in the file yet, and the
+    file's next last id and gaps (ids in the rescan window below it not seen so far)."""
+    last, gaps = section['last_id'], set(section.get('gaps', ()))
+    new = [i for i in ids if i > last or i in gaps]
+    mark = max([last, *new])
+    gaps.difference_update(new)
+    seen = set(new)
+    gaps.update(i for i in range(max(last, mark - RESCAN_IDS) + 1, mark) if i not in seen)
+    return new, mark, sorted(i for i in gaps if i > mark - RESCAN_IDS)
+
+def _csv_bytes(rows) -> bytes:
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator='\n').writerows(rows)
+    return buf.getvalue().encode('utf-8')
+
+def _write_atomic(path, write):
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'w', newline='', encoding='utf-8') as f:
+        write(f)
+        f.flush(); os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def _write_at(path, offset: int, data: bytes = b'') -> int:
+    """Cut ``path`` at byte ``offset``, append ``data`` and sync; returns the new size."""
+    with open(path, 'r+b') as f:
+        f.truncate(offset); f.seek(offset)
+        f.write(data)
+        f.flush(); os.fsync(f.fileno())
+    return offset + len(data)
+
+def _reset(path, columns) -> int:
+    with open(path, 'wb') as f:
+        f.write(_csv_bytes([columns]))
+        f.flush(); os.fsync(f.fileno())
+    return path.stat().st_size
+
+@contextmanager
+def _exclusive():
+    """One export at a time, across threads and processes: another export's truncate at offsets
+    this one has just moved would cut or duplicate rows."""
+    with _lock:
+        EXPORT_LOCK.parent.mkdir(parents=True, exist_ok=True)
+        with open(EXPORT_LOCK, 'a+b') as f:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                while True:  # LK_LOCK gives up after 10 tries
+                    try: msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1); break
+                    except OSError: pass
+            try:
+                yield
+            finally:
+                if fcntl: fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                else: f.seek(0); msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def _load_state() -> dict:
+    try:
+        with open(EXPORT_STATE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_state(state: dict) -> None:
+    _write_atomic(EXPORT_STATE, lambda f: json.dump(state, f))
+
+def _committed(path, section):
+    """``section`` if ``path`` still holds everything it records, else None (rebuild the file).
+    Bytes past the recorded size are from an export that crashed before saving; they get cut."""
+    if not section or not path.exists() or path.stat().st_size < section['size']:
+        return None
+    return section
+
+def _start_over(state, key, path, columns) -> int:
+    # Forget the file's progress first: a crash during the rebuild then just rebuilds again
+    state.pop(key, None)
+    _save_state(state)
+    return _reset(path, columns)
+
+def _update_master() -> int:
+    """Append rows not yet in the master CSV, in id order; returns how many.
+    Reads the state afresh: call with the export lock held."""
+    state = _load_state()
+    m = _committed(AUTO_EXPORT_MASTER, state.get('master'))
+    if m is None:
+        m = {'last_id': 0, 'size': _start_over(state, 'master', AUTO_EXPORT_MASTER, MASTER_COLUMNS)}
+    # Ids first: the rescan window is cheap to probe, and usually holds nothing new
+    new, mark, gaps = _advance(m, _ids_since(_low(m)))
+    wanted = set(new)
+    rows = [r for r in fetch_rows_since(new[0] - 1) if r[0] in wanted] if new else []
+    size = m['size']
+    if rows or AUTO_EXPORT_MASTER.stat().st_size != size:
+        size = _write_at(AUTO_EXPORT_MASTER, size, _csv_bytes(rows))
+    state['master'] = {'last_id': mark, 'size': size, 'gaps': gaps}
+    _save_state(state)
+    return len(rows)
+
+def _update_daily() -> None:
+    """Rewrite the daily CSV from the earliest day with new rows on; earlier days are left alone.
+    The state keeps the byte offset where each day's rows start. Call with the export lock held."""
+    state = _load_state()
+    d = _committed(AUTO_EXPORT_DAILY, state.get('daily'))
+    rebuild = d is None
+    if rebuild:
+        d = {'last_id': 0, 'size': _start_over(state, 'daily', AUTO_EXPORT_DAILY, DAILY_COLUMNS), 'days': {}}
+    fetched = _ids_since(_low(d), with_day=True)
+    new, mark, gaps = _advance(d, [i for i, _ in fetched])
+    new = set(new)
+    since = None if rebuild else min((day for i, day in fetched if i in new), default=None)
+    if since is not None: since = _fmt(since, '%Y-%m-%d')
+    if not rebuild and since is None:
+        if AUTO_EXPORT_DAILY.stat().st_size != d['size']: _write_at(AUTO_EXPORT_DAILY, d['size'])
+        if gaps != d.get('gaps', []):
+            state['daily'] = dict(d, gaps=gaps)
+            _save_state(state)
+        return
+    offset = min((off for day, off in d['days'].items() if since is None or day >= since), default=d['size'])
+    days = {day: off for day, off in d['days'].items() if since is not None and day < since}
+    chunks, size = [], offset
+    for row in fetch_daily_since(since):
+        days.setdefault(row[4], size)
+        chunk = _csv_bytes([row])
+        chunks.append(chunk); size += len(chunk)
+    size = _write_at(AUTO_EXPORT_DAILY, offset, b''.join(chunks))
+    state['daily'] = {'last_id': mark, 'size': size, 'days': days, 'gaps': gaps}
+    _save_state(state)
+
+def _export() -> int:
+    added = _update_master()
+    _update_daily()
+    return added
+
+@timed
+def export_incremental() -> int:
+    """Bring both CSVs up to date with the attendance table; returns how many rows were added.
+
+    The work done depends on the new rows, not on the size of the files. Each file's
+    progress is saved right after that file is synced, so a crash at any point is made good
+    by the next export. A missing file, or one shorter than its saved progress, is rebuilt.
+    """
+    with _exclusive():
+        return _export()
+
+@timed
 def export_all():
-    export_master()
-    export_daily()
+    """Rewrite both CSVs from the whole table (needed after records are deleted or edited)."""
+    with _exclusive():
+        for path in (AUTO_EXPORT_MASTER, AUTO_EXPORT_DAILY, EXPORT_STATE):
+            path.unlink(missing_ok=True)
+        _export()
+
+class ExportService:
+    """Coalesces export triggers: at most one incremental export per ``window`` seconds."""
+
+    def __init__(self, window: float = 2.0):
+        self.window = window
+        self._dirty = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="auto-export", daemon=True)
+
+    def start(self) -> "ExportService":
+        self._thread.start()
+        return self
+
+    def trigger(self) -> None:
+        self._dirty.set()
+
+    def _export(self) -> None:
+        self._dirty.clear()
+        try:
+            export_incremental()
+        except Exception as e:
+            print(f"[ERROR] Auto export failed: {e}")
+            self._dirty.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if not self._dirty.wait(0.5): continue
+            # Let triggers arriving within the window ride along with this export
+            if self._stop.wait(self.window): break
+            self._export()
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive(): self._thread.join()
+        if self._dirty.is_set(): self._export()
@@ -0,0 +1,163 @@
+import csv, glob, json, sys, time, cv2
+from multiprocessing import Pool
+from pathlib import Path
+from .detection import FaceDetector
+from .recognize_and_mark import load_model
+
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp"}
+
+def resolve_input(spec: str):
+    """('video', path) for a video file, or ('images', paths) for an image, a directory or a glob."""
+    path = Path(spec)
+    if path.is_dir():
+        return "images", sorted(str(p) for p in path.iterdir() if p.suffix.lower() in IMAGE_EXTS)
+    if glob.has_magic(spec):
+        return "images", sorted(p for p in glob.glob(spec, recursive=True) if Path(p).suffix.lower() in IMAGE_EXTS)
+    if not path.exists():
+        raise FileNotFoundError(f"No such input: {spec}")
+    if path.suffix.lower() in IMAGE_EXTS:
+        return "images", [str(path)]
+    return "video", str(path)
+
+# Per-process recognizer state, loaded once by the pool initializer
+_state = None
+
+def _init(threshold):
+    global _state
+    matcher, label_map = load_model(threshold)
+    _state = (matcher, label_map, FaceDetector(), threshold)
+
+def _recognize(frame, where, sightings):
+    matcher, label_map, detector, threshold = _state
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    faces = detector.detect(gray)
+    for (label_id, conf) in matcher.predict_batch([gray[y:y+h, x:x+w] for (x,y,w,h) in faces]):
+        meta = label_map.get(str(label_id)) or label_map.get(label_id)
+        if meta and conf <= threshold:
+            _merge(sightings, meta["person_id"], {"name": meta["name"], "first_seen": where, "frames": 1, "best_conf": conf})
+
+def _merge(sightings, person_id, seen):
+    """Fold one person's sighting summary into ``sightings``; ``first_seen`` must sort chronologically."""
+    cur = sightings.get(person_id)
+    if cur is None:
+        sightings[person_id] = dict(seen); return
+    cur["first_seen"] = min(cur["first_seen"], seen["first_seen"])
+    cur["frames"] += seen["frames"]
+    cur["best_conf"] = min(cur["best_conf"], seen["best_conf"])
+
+def scan_video_range(path: str, start: int, end: int, stride: int, seek: bool):
+    """Recognize frames start, start+stride, ... < end; returns (sightings, frames processed).
+    ``first_seen`` is the frame's time in seconds."""
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    sightings, done = {}, 0
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    for idx in range(start, end, stride):
+        if seek and idx != start:
+            # Jump straight to the frame (codec seeks to the keyframe before it)
+            cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+        ok, frame = cap.read()
+        if not ok: break
+        _recognize(frame, idx / fps, sightings)
+        done += 1
+        if not seek:
+            # Skip the frames in between without converting them
+            for _ in range(min(stride, end - idx) - 1):
+                if not cap.grab(): break
+    cap.release()
+    return sightings, done
+
+def scan_images(paths):
+    """``first_seen`` is the image's position in the sorted input, as (index, path)."""
+    sightings, done = {}, 0
+    for i, p in paths:
+        frame = cv2.imread(p)
+        if frame is None:
+            print(f"[WARN] Cannot read {p}"); continue
+        _recognize(frame, (i, p), sightings)
+        done += 1
+    return sightings, done
+
+def _scan_video_task(task):
+    return scan_video_range(*task)
+
+def _scan_images_task(task):
+    return scan_images(task)
+
+def _chunks(n, parts):
+    step = max(1, -(-n // max(parts, 1)))
+    return [(i, min(i + step, n)) for i in range(0, n, step)]
+
+def run_batch(source: str, threshold: float, stride: int = 1, seek: bool = False, workers: int = 1):
+    """Recognize every face in a video or set of images; returns (sightings by person_id, frames processed)."""
+    kind, target = resolve_input(source)
+    stride = max(1, stride)
+    if kind == "video":
+        cap = cv2.VideoCapture(target)
+        if not cap.isOpened():
+            raise RuntimeError(f"Cannot open video {target}")
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+        # Time-range chunks, a few per worker so slow stretches even out; starts stay on the stride grid
+        ranges = _chunks(-(-total // stride), workers * 4 if workers > 1 else 1)
+        tasks = [(target, a * stride, min(b * stride, total), stride, seek) for a, b in ranges]
+        if total <= 0:
+            tasks = [(target, 0, sys.maxsize, stride, seek)]  # length unknown: one pass to the end
+        fn = _scan_video_task
+    else:
+        if not target:
+            raise RuntimeError(f"No images found for {source}")
+        indexed = list(enumerate(target))[::stride]
+        tasks = [indexed[a:b] for a, b in _chunks(len(indexed), workers * 4 if workers > 1 else 1)]
+        fn = _scan_images_task
+
+    sightings, frames = {}, 0
+    if workers > 1:
+        with Pool(workers, initializer=_init, initargs=(threshold,)) as pool:
+            results = list(pool.imap_unordered(fn, tasks))
+    else:
+        _init(threshold)
+        results = map(fn, tasks)
+    for part, done in results:
+        frames += done
+        for person_id, seen in part.items():
+            _merge(sightings, person_id, seen)
+    return sightings, frames
+
+def _fmt_seen(first_seen):
+    if isinstance(first_seen, (tuple, list)):
+        return first_seen[1]
+    m, s = divmod(first_seen, 60)
+    return f"{int(m // 60):02d}:{int(m % 60):02d}:{s:04.1f}"
+
+def write_report(path: str, subject_id: str, source: str, sightings) -> None:
+    rows = [{"person_id": pid, "name": s["name"], "subject_id": subject_id, "first_seen": _fmt_seen(s["first_seen"]),
+             "frames": s["frames"], "best_conf": round(s["best_conf"], 2)}
+            for pid, s in sorted(sightings.items(), key=lambda kv: kv[1]["first_seen"])]
+    if path.lower().endswith(".json"):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"source": source, "subject_id": subject_id, "people": rows}, f, indent=2)
+    else:
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=["person_id", "name", "subject_id", "first_seen", "frames", "best_conf"])
+            w.writeheader(); w.writerows(rows)
+
+def main_batch(args):
+    """Headless ``recognize_and_mark --input``: report to a file, or mark attendance in the DB."""
+    t0 = time.perf_counter()
+    sightings, frames = run_batch(args.input, args.threshold, args.stride, args.seek, args.workers)
+    elapsed = time.perf_counter() - t0
+    print(f"[TIME] {frames} frames in {elapsed:.1f}s ({frames / max(elapsed, 1e-9):.1f} frames/s)")
+    print(f"[INFO] {len(sightings)} people recognized")
+    if args.report:
+        write_report(args.report, args.subject_id, args.input, sightings)
+        print(f"[OK] Report written to {args.report}")
+        return
+    from datetime import datetime
+    from .attendance_db import init_db, mark_attendance, add_manual_attendance
+    init_db()
+    day = datetime.strptime(args.date, "%Y-%m-%d").date() if args.date else None
+    for person_id, seen in sorted(sightings.items(), key=lambda kv: kv[1]["first_seen"]):
+        created, msg = (add_manual_attendance(person_id, args.subject_id, day) if day
+                        else mark_attendance(person_id, args.subject_id))
+        print(f"[{'OK' if created else 'INFO'}] {seen['name']} ({person_id}): {msg}")
@@ -0,0 +1,104 @@
+import argparse, json, time, cv2
+from pathlib import Path
+from .batch_recognize import resolve_input
+from .detection import BACKENDS, FaceDetector, available_backends, parse_roi
+from .tracker import iou
+
+def load_frames(source: str, limit: int, stride: int):
+    """(keys, gray frames); a key is the image file name, or the frame number for a video."""
+    kind, target = resolve_input(source)
+    keys, frames = [], []
+    if kind == "video":
+        cap = cv2.VideoCapture(target)
+        idx = 0
+        while len(frames) < limit:
+            ok, frame = cap.read()
+            if not ok: break
+            if idx % stride == 0:
+                keys.append(str(idx)); frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+            idx += 1
+        cap.release()
+    else:
+        for p in target[::stride][:limit]:
+            img = cv2.imread(p, cv2.IMREAD_GRAYSCALE)
+            if img is not None:
+                keys.append(Path(p).name); frames.append(img)
+    return keys, frames
+
+def run(detector, frames, repeats):
+    boxes = [detector.detect(g) for g in frames]  # warm-up, and the boxes to score
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        for g in frames: detector.detect(g)
+    return boxes, len(frames) * repeats / (time.perf_counter() - t0)
+
+def inside(box, rois) -> bool:
+    cx, cy = box[0] + box[2] / 2, box[1] + box[3] / 2
+    return any(x <= cx < x + w and y <= cy < y + h for (x, y, w, h) in rois)
+
+def score(reference, found, rois=None):
+    """(recall, extra): share of reference boxes matched at IoU >= 0.5, and unmatched detections.
+    With ``rois`` only reference faces centred inside them count."""
+    total = hit = extra = 0
+    for ref, got in zip(reference, found):
+        got = [tuple(b) for b in got]
+        if rois: ref = [r for r in ref if inside(r, rois)]
+        total += len(ref)
+        for r in ref:
+            match = next((b for b in got if iou(tuple(r), b) >= 0.5), None)
+            if match is not None:
+                hit += 1; got.remove(match)
+        extra += len(got)
+    return (hit / total if total else 1.0), extra
+
+def main():
+    p = argparse.ArgumentParser(description="Face detection speed and recall across backends, downscaling and ROIs")
+    p.add_argument("input", help="Video file, image directory, or image glob")
+    p.add_argument("--labels", help='JSON of true face boxes per image name (or frame number): {"img.jpg": [[x,y,w,h]]}; '
+                                    "without it recall is measured against Haar at full resolution")
+    p.add_argument("--backends", nargs="+", choices=list(BACKENDS), help="Default: every backend with a model file")
+    p.add_argument("--frames", type=int, default=200, help="Frames to load")
+    p.add_argument("--stride", type=int, default=1, help="Use every Nth frame")
+    p.add_argument("--repeats", type=int, default=1)
+    p.add_argument("--min-face", type=int, default=100)
+    p.add_argument("--face-px", type=int, nargs="+", default=[0, 24, 32, 48],
+                   help="Downscaled sizes of the smallest face to try; 0 = full resolution, always run first")
+    p.add_argument("--roi", type=parse_roi, action="append", help="x,y,w,h; repeat for several regions")
+    args = p.parse_args()
+
+    keys, frames = load_frames(args.input, args.frames, max(1, args.stride))
+    if args.labels:
+        with open(args.labels, "r", encoding="utf-8") as f:
+            labels = json.load(f)
+        keep = [i for i, k in enumerate(keys) if k in labels]
+        frames = [frames[i] for i in keep]
+        reference = [[tuple(b) for b in labels[keys[i]]] for i in keep]
+    if not frames:
+        print(f"[ERROR] No {'labeled ' if args.labels else ''}frames read from {args.input}"); return
+    print(f"[INFO] {len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]}")
+    if not args.labels:
+        # The old settings: Haar at full resolution over the whole frame
+        reference, _ = run(FaceDetector("haar", min_face=args.min_face, face_px=None, rois=[]), frames, 0)
+    print(f"[INFO] {sum(len(b) for b in reference)} reference faces"
+          + ("" if args.labels else " (Haar, full resolution)"))
+
+    # Full resolution is the baseline the speedups are relative to, so it runs even if not asked for
+    sizes = [0] + [px for px in dict.fromkeys(args.face_px) if px]
+    configs = [(f"face_px={px}" if px else "full res", px, []) for px in sizes]
+    if args.roi:
+        configs += [(f"roi, face_px={px}" if px else "roi, full res", px, args.roi) for px in sizes]
+    print(f"{'backend':<8} {'setting':<18} {'ms/frame':>9} {'fps':>8} {'speedup':>8} {'recall':>7} {'extra':>6}")
+    base_fps = None
+    for backend in args.backends or available_backends(report=True):
+        for label, px, rois in configs:
+            try:
+                detector = FaceDetector(backend, min_face=args.min_face, face_px=px, rois=rois)
+            except RuntimeError as e:
+                print(f"[SKIP] {backend}: {e}"); break
+            found, fps = run(detector, frames, max(1, args.repeats))
+            base_fps = base_fps or fps
+            recall, extra = score(reference, found, rois)
+            print(f"{backend:<8} {label:<18} {1000 / fps:>9.2f} {fps:>8.1f} {fps / base_fps:>7.1f}x {recall:>7.3f} {extra:>6}")
+
+if __name__ == "__main__":
+    main()
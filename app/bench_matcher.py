@@ -0,0 +1,53 @@
+import argparse, time, cv2, numpy as np
+from .matcher import BatchLBPHMatcher
+
+def _identity(rng, size=(103, 103)):
+    # Smoothed noise gives LBP histograms with face-like sparsity; plain noise fills every bin
+    return cv2.GaussianBlur(rng.integers(0, 256, size, dtype=np.uint8), (7, 7), 0)
+
+def _sample(rng, base, size=(100, 100)):
+    # A "photo" of an identity: small shift plus sensor noise
+    dy, dx = rng.integers(0, base.shape[0] - size[0] + 1), rng.integers(0, base.shape[1] - size[1] + 1)
+    crop = base[dy:dy + size[0], dx:dx + size[1]].astype(np.int16) + rng.integers(-3, 4, size, dtype=np.int16)
+    return np.clip(crop, 0, 255).astype(np.uint8)
+
+def bench(n_samples, n_faces, repeats, rng, per_person=10, unknown=False):
+    people = [_identity(rng) for _ in range(max(n_samples // per_person, 1))]
+    labels = np.arange(n_samples, dtype=np.int32) % len(people)
+    recognizer = cv2.face.LBPHFaceRecognizer_create(radius=1, neighbors=8, grid_x=8, grid_y=8)
+    recognizer.train([_sample(rng, people[l]) for l in labels], labels)
+    matcher = BatchLBPHMatcher.from_recognizer(recognizer)
+    if unknown:  # nobody in the model: little can be pruned, every face meets a near-full exact pass
+        faces = [_sample(rng, _identity(rng)) for _ in range(n_faces)]
+    else:
+        faces = [_sample(rng, people[i]) for i in rng.integers(0, len(people), n_faces)]
+
+    t0 = time.perf_counter()
+    for _ in range(repeats): expected = [recognizer.predict(f) for f in faces]
+    t_predict = (time.perf_counter() - t0) / repeats
+
+    t0 = time.perf_counter()
+    for _ in range(repeats): got = matcher.predict_batch(faces)
+    t_batch = (time.perf_counter() - t0) / repeats
+
+    same = all(e[0] == g[0] and e[1] == g[1] for e, g in zip(expected, got))
+    return t_predict, t_batch, same
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark per-face predict() against the batched matcher")
+    p.add_argument("--samples", type=int, nargs="+", default=[100, 1000, 10000])
+    p.add_argument("--faces", type=int, default=8, help="Faces per frame")
+    p.add_argument("--repeats", type=int, default=3)
+    p.add_argument("--seed", type=int, default=0)
+    args = p.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'samples':>8} {'faces':>8} {'predict ms':>11} {'batch ms':>9} {'speedup':>8}  identical")
+    for n in args.samples:
+        for unknown in (False, True):
+            t_predict, t_batch, same = bench(n, args.faces, args.repeats, rng, unknown=unknown)
+            print(f"{n:>8} {'unknown' if unknown else 'known':>8} {t_predict*1e3:>11.2f} {t_batch*1e3:>9.2f} "
+                  f"{t_predict/t_batch:>7.1f}x  {same}")
+
+if __name__ == "__main__":
+    main()
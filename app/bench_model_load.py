@@ -0,0 +1,60 @@
+import argparse, shutil, tempfile, time, cv2, numpy as np
+from pathlib import Path
+from .matcher import BatchLBPHMatcher, matrix_paths
+from .train_model import write_lbph
+
+def synthetic_model(path: Path, n_samples: int, rng, n_people: int = 50):
+    """Write an LBPH YAML model of ``n_samples`` sparse, per-cell normalized histograms."""
+    recognizer = cv2.face.LBPHFaceRecognizer_create(radius=1, neighbors=8, grid_x=8, grid_y=8)
+    hists = []
+    for _ in range(n_samples):
+        h = rng.gamma(0.3, size=(64, 256)).astype(np.float32)
+        h[h < 0.05] = 0
+        hists.append((h / np.maximum(h.sum(axis=1, keepdims=True), 1e-6)).reshape(1, -1))
+    write_lbph(path, recognizer, hists, np.arange(n_samples) % n_people)
+
+def size_mb(*paths) -> float:
+    return sum(Path(p).stat().st_size for p in paths) / 2**20
+
+def bench(work: Path, n_samples: int, faces, rng):
+    yaml_path, npz_path = work / f"model_{n_samples}.yml", work / f"model_{n_samples}.npz"
+    synthetic_model(yaml_path, n_samples, rng)
+    BatchLBPHMatcher.load(yaml_path).save(npz_path)
+
+    times = {}
+    for kind, path in (("yaml", yaml_path), ("binary", npz_path)):
+        t0 = time.perf_counter()
+        matcher = BatchLBPHMatcher.load(path)
+        t_load = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        predictions = matcher.predict_batch(faces)
+        times[kind] = (t_load, time.perf_counter() - t0, predictions)
+        del matcher
+    sizes = size_mb(yaml_path), size_mb(npz_path, *matrix_paths(npz_path))
+    return times, sizes
+
+def main():
+    p = argparse.ArgumentParser(description="Model load time: OpenCV YAML against the memory-mapped binary format")
+    p.add_argument("--samples", type=int, nargs="+", default=[500, 2000], help="Training samples in the model")
+    p.add_argument("--faces", type=int, default=8, help="Faces in the first prediction after loading")
+    p.add_argument("--seed", type=int, default=0)
+    args = p.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    faces = [cv2.GaussianBlur(rng.integers(0, 256, (100, 100), dtype=np.uint8), (7, 7), 0) for _ in range(args.faces)]
+    work = Path(tempfile.mkdtemp(prefix="attendance-model-"))
+    # Files were just written, so both loads read from the page cache; a cold YAML load is slower still
+    print(f"{'samples':>8} {'yaml MB':>8} {'bin MB':>7} {'yaml load s':>12} {'bin load ms':>12} {'speedup':>8} "
+          f"{'1st predict ms (yaml/bin)':>26}  identical")
+    try:
+        for n in args.samples:
+            times, (yaml_mb, bin_mb) = bench(work, n, faces, rng)
+            (y_load, y_pred, y_out), (b_load, b_pred, b_out) = times["yaml"], times["binary"]
+            print(f"{n:>8} {yaml_mb:>8.1f} {bin_mb:>7.1f} {y_load:>12.2f} {b_load * 1e3:>12.2f} {y_load / b_load:>7.0f}x "
+                  f"{y_pred * 1e3:>12.1f} / {b_pred * 1e3:<11.1f}  {y_out == b_out}")
+            for f in work.iterdir(): f.unlink()
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
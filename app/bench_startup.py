@@ -0,0 +1,56 @@
+import argparse, statistics, subprocess, sys, time
+from pathlib import Path
+from .recognize_and_mark import model_file
+from .worker import TaskWorker, WARM
+
+ROOT = Path(__file__).resolve().parent.parent
+# What an action cost before the worker: a fresh interpreter importing the script, opening the
+# database and loading the model, before it could grab the first camera frame
+LAUNCH = ("from app.attendance_db import init_db; from app.recognize_and_mark import load_model; "
+          "import app.train_model, app.register_faces; init_db(); load_model(70.0)")
+
+def fresh(code: str) -> float:
+    """Seconds for a new interpreter to run ``code`` (interpreter start-up included)."""
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - t0
+
+def median_ms(fn, repeats: int) -> float:
+    return 1000 * statistics.median(fn() for _ in range(repeats))
+
+def main():
+    p = argparse.ArgumentParser(description="GUI cold start and action-launch latency, with and without the worker")
+    p.add_argument("--repeats", type=int, default=5)
+    args = p.parse_args()
+
+    print(f"[INFO] Model: {model_file() or 'none trained'}")
+    try:
+        gui = median_ms(lambda: fresh("import app.main"), args.repeats)
+        print(f"[BENCH] import app.main (GUI cold start, before the window): {gui:.0f} ms")
+    except subprocess.CalledProcessError:
+        print("[SKIP] app.main cannot be imported here (no tkinter)")
+    bare = median_ms(lambda: fresh("pass"), args.repeats)
+    db = median_ms(lambda: fresh("import app.attendance_db, app.importer"), args.repeats)
+    print(f"[BENCH] interpreter alone: {bare:.0f} ms; + DB stack and importer, no longer imported before the "
+          f"window: {db:.0f} ms")
+
+    spawn = median_ms(lambda: fresh(LAUNCH), args.repeats)
+    print(f"[BENCH] action launch, new process per action (before): {spawn:.0f} ms")
+
+    worker = TaskWorker()
+    t0 = time.perf_counter()
+    worker.start()
+    worker.wait(worker.submit(WARM), timeout=300)
+    print(f"[BENCH] worker start-up, in the background while the GUI shows: {1000 * (time.perf_counter() - t0):.0f} ms")
+    def launch():
+        t = time.perf_counter()
+        worker.wait(worker.submit(WARM), timeout=60)
+        return time.perf_counter() - t
+    try:
+        warm = median_ms(launch, args.repeats)
+    finally:
+        worker.close()
+    print(f"[BENCH] action launch, pre-warmed worker (after): {warm:.1f} ms ({spawn / warm:.0f}x faster)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""End-to-end throughput of the real code paths on synthetic classroom data.
+
+Face crops from the sample dataset are augmented into a synthetic training set and pasted
+into classroom-sized frames. Training, detection, recognition, marking, bulk import and
+export then run in a scratch data directory with SQLite standing in for the database.
+Each stage is timed ``--repeats`` times and its best run counts, so one slow run caused by
+the machine does not fail the check. Results go to JSON; with a baseline the run fails when a
+stage is slower than allowed.
+
+    python -m app.bench_suite --out bench.json
+    python -m app.bench_suite --save-baseline    # after a deliberate change in speed
+"""
+import argparse, json, os, platform, shutil, sys, tempfile, time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+# Everything below writes into a scratch copy, so point the config there before importing the app
+WORK_DIR = Path(tempfile.mkdtemp(prefix="attendance-bench-"))
+os.environ["ATTENDANCE_DATA_DIR"] = str(WORK_DIR)
+os.environ["ATTENDANCE_DB_BACKEND"] = "sqlite"
+os.environ["ATTENDANCE_SQLITE_PATH"] = str(WORK_DIR / "attendance.db")
+
+import cv2, numpy as np
+from . import attendance_db as db, train_model
+from .auto_export import export_all
+from .config import DATASET_DIR
+from .detection import FaceDetector
+from .recognize_and_mark import load_model
+from .tracker import iou
+
+ROOT = Path(__file__).resolve().parent.parent
+SAMPLE_FACES = ROOT / "atm1" / "app" / "data" / "dataset"
+BASELINE_PATH = ROOT / "bench_baseline.json"
+
+def load_sources(faces_dir: Path):
+    crops = [cv2.imread(str(p), cv2.IMREAD_GRAYSCALE) for p in sorted(faces_dir.rglob("*.png"))]
+    crops = [c for c in crops if c is not None]
+    if not crops:
+        raise RuntimeError(f"No face crops (*.png) under {faces_dir}")
+    return crops
+
+def make_identity(rng, crop):
+    """A synthetic person: a source face under its own fixed shading pattern, maybe mirrored.
+    (A plain tone change would not do: LBP histograms ignore monotonic brightness changes.)"""
+    h, w = crop.shape
+    shading = cv2.resize(rng.uniform(0.75, 1.25, (6, 6)).astype(np.float32), (w, h), interpolation=cv2.INTER_CUBIC)
+    face = np.clip(crop * shading, 0, 255).astype(np.uint8)
+    return cv2.flip(face, 1) if rng.random() < 0.5 else face
+
+def augment(rng, face):
+    """One "photo" of an identity: small rotation and shift, lighting change and sensor noise."""
+    h, w = face.shape
+    m = cv2.getRotationMatrix2D((w / 2, h / 2), rng.uniform(-4, 4), rng.uniform(0.97, 1.03))
+    m[:, 2] += rng.uniform(-0.02, 0.02, 2) * w
+    out = cv2.warpAffine(face, m, (w, h), borderMode=cv2.BORDER_REFLECT).astype(np.float32)
+    out = out * rng.uniform(0.8, 1.2) + rng.uniform(-20, 20) + rng.normal(0, 3, out.shape)
+    return np.clip(out, 0, 255).astype(np.uint8)
+
+def write_dataset(rng, identities, samples: int) -> int:
+    for i, face in enumerate(identities):
+        person_dir = DATASET_DIR / f"{i + 1}_Synthetic_{i + 1}"
+        person_dir.mkdir(parents=True, exist_ok=True)
+        for k in range(samples):
+            cv2.imwrite(str(person_dir / f"img_{k:03d}.png"), augment(rng, face))
+    return len(identities) * samples
+
+def classroom_frame(rng, identities, crowd: int, size=(1920, 1080), cell: int = 200):
+    """Gray frame with ``crowd`` faces in distinct grid cells; returns (frame, [(box, label)])."""
+    w, h = size
+    frame = np.tile(np.linspace(70, 180, h, dtype=np.float32)[:, None], (1, w))
+    for _ in range(12):  # desks, boards, windows
+        x, y = int(rng.integers(0, w - 200)), int(rng.integers(0, h - 100))
+        frame[y:y + int(rng.integers(40, 100)), x:x + int(rng.integers(100, 200))] = rng.uniform(40, 220)
+    frame = np.clip(frame + rng.normal(0, 4, frame.shape), 0, 255).astype(np.uint8)
+    cols, rows = w // cell, h // cell
+    faces = []
+    for c in rng.choice(cols * rows, size=min(crowd, cols * rows), replace=False):
+        label = int(rng.integers(len(identities)))
+        face = augment(rng, identities[label])
+        fs = int(rng.integers(110, 140))
+        margin = face.shape[0] // 5  # some head and background around the crop, as a camera sees it
+        padded = cv2.copyMakeBorder(face, margin, margin, margin, margin, cv2.BORDER_REPLICATE)
+        ps = fs * padded.shape[0] // face.shape[0]
+        padded = cv2.resize(padded, (ps, ps), interpolation=cv2.INTER_AREA)
+        x, y = (c % cols) * cell + int(rng.integers(0, cell - ps + 1)), (c // cols) * cell + int(rng.integers(0, cell - ps + 1))
+        frame[y:y + ps, x:x + ps] = padded
+        off = margin * ps // (face.shape[0] + 2 * margin)
+        faces.append(((x + off, y + off, ps - 2 * off, ps - 2 * off), label + 1))
+    return frame, faces
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+def best(fn, repeats: int):
+    """fn(run_index) timed ``repeats`` times: (output of the fastest run, its seconds, every run's seconds)."""
+    runs = [timed(lambda: fn(r)) for r in range(repeats)]
+    out, dt = min(runs, key=lambda run: run[1])
+    return out, dt, [run[1] for run in runs]
+
+def stage(results, name, count, seconds, unit, runs=None, **extra):
+    rate = count / seconds if seconds > 0 else float("inf")
+    results[name] = {"value": round(rate, 2), "unit": unit, "count": count, "seconds": round(seconds, 4),
+                     "runs": [round(s, 4) for s in runs or [seconds]], **extra}
+    more = "".join(f", {k}={v}" for k, v in extra.items())
+    spread = f", best of {len(runs)}: {min(runs):.2f}-{max(runs):.2f}s" if runs and len(runs) > 1 else ""
+    print(f"[BENCH] {name}: {rate:.1f} {unit} ({count} in {seconds:.2f}s{spread}{more})")
+
+def run(args):
+    rng = np.random.default_rng(args.seed)
+    results = {}
+    sources = load_sources(Path(args.faces))
+    identities = [make_identity(rng, sources[i % len(sources)]) for i in range(args.people)]
+
+    n_images = write_dataset(rng, identities, args.samples)
+    _, dt, runs = best(lambda r: train_model.main(["--no-cache", "--workers", "1"]), args.repeats)
+    stage(results, "train", n_images, dt, "images/s", runs)
+
+    detector = FaceDetector()
+    matcher, label_map = load_model(args.threshold)
+    by_person = {meta["person_id"]: int(label) for label, meta in label_map.items()}
+    all_faces = []
+    for crowd in args.crowd:
+        frames = [classroom_frame(rng, identities, crowd) for _ in range(args.frames)]
+        found, dt, runs = best(lambda r: [detector.detect(f) for f, _ in frames], args.repeats)
+        truth = sum(len(faces) for _, faces in frames)
+        hits = sum(any(iou(box, tuple(b)) >= 0.3 for b in got) for (_, faces), got in zip(frames, found) for box, _ in faces)
+        stage(results, f"detect_crowd_{crowd}", len(frames), dt, "frames/s", runs, recall=round(hits / max(truth, 1), 3))
+        all_faces += [(f[y:y + h, x:x + w], label) for f, faces in frames for (x, y, w, h), label in faces]
+
+    crops = [c for c, _ in all_faces]
+    predictions, dt, runs = best(lambda r: [p for i in range(0, len(crops), 32) for p in matcher.predict_batch(crops[i:i + 32])],
+                                 args.repeats)
+    correct = sum(by_person.get(str(label)) == pred for (_, label), (pred, _) in zip(all_faces, predictions))
+    stage(results, "recognize", len(crops), dt, "faces/s", runs, accuracy=round(correct / max(len(crops), 1), 3))
+
+    db.init_db()
+    students = [str(i + 1) for i in range(args.students)]
+    for p in students: db.upsert_student(p, f"Student {p}")
+    # Every run marks new (person, subject) pairs for today: a subject set of its own per run
+    per_run = -(-args.marks // len(students))
+    for r in range(args.repeats):
+        for j in range(per_run): db.add_subject(f"R{r}S{j:02d}", f"Subject {r}/{j}")
+    def mark_run(r):
+        pairs = [(p, f"R{r}S{j:02d}") for j in range(per_run) for p in students][:args.marks]
+        for p, s in pairs: db.mark_attendance(p, s)
+        return len(pairs)
+    n_marks, dt, runs = best(mark_run, args.repeats)
+    stage(results, "mark_attendance", n_marks, dt, "marks/s", runs)
+
+    subjects = [f"S{j:02d}" for j in range(args.subjects)]
+    for s in subjects: db.add_subject(s, f"Subject {s}")
+    days_per_run = args.import_rows // (len(students) * len(subjects)) + 1
+    def import_run(r):
+        # Each run imports onto its own earlier days, so nothing is a duplicate of the last run
+        first_day = date.today() - timedelta(days=1 + r * days_per_run)
+        return db.bulk_import_attendance([(students[i % len(students)], subjects[(i // len(students)) % len(subjects)],
+                                           first_day - timedelta(days=i // (len(students) * len(subjects))))
+                                          for i in range(args.import_rows)])
+    (ok, dup, errors), dt, runs = best(import_run, args.repeats)
+    stage(results, "bulk_import_attendance", ok, dt, "rows/s", runs, duplicates=dup, errors=len(errors))
+
+    rows = n_marks * args.repeats + ok * args.repeats
+    _, dt, runs = best(lambda r: export_all(), args.repeats)
+    stage(results, "export_all", rows, dt, "rows/s", runs)
+    return results
+
+def compare(results, baseline, tolerance: float, quality_slack: float = 0.05):
+    """Names of stages slower than ``(1 - tolerance)`` times their baseline, or whose recall or
+    accuracy dropped by more than ``quality_slack``."""
+    slow = []
+    for name, base in baseline.get("stages", {}).items():
+        cur = results.get(name)
+        if cur is None: continue
+        ratio = cur["value"] / base["value"] if base["value"] else float("inf")
+        flag = "SLOW" if ratio < 1 - tolerance else "ok"
+        for key in ("recall", "accuracy"):
+            if key in base and cur.get(key, 0) < base[key] - quality_slack:
+                flag = f"{key.upper()} {cur.get(key)} < {base[key]}"
+        print(f"[STATS] {name}: {cur['value']:.1f} vs baseline {base['value']:.1f} {cur['unit']} ({ratio:.2f}x) {flag}")
+        if flag != "ok": slow.append(name)
+    return slow
+
+def main():
+    p = argparse.ArgumentParser(description="End-to-end benchmark on synthetic data, checked against a baseline")
+    p.add_argument("--out", help="Write results to this JSON file")
+    p.add_argument("--baseline", default=str(BASELINE_PATH), help="Baseline JSON to compare with")
+    p.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline instead of comparing")
+    p.add_argument("--tolerance", type=float, default=0.3, help="Allowed slowdown per stage (0.3 = 30%%)")
+    p.add_argument("--repeats", type=int, default=3, help="Runs per stage; the fastest counts")
+    p.add_argument("--faces", default=str(SAMPLE_FACES), help="Directory of face crops to synthesize people from")
+    p.add_argument("--people", type=int, default=20)
+    p.add_argument("--samples", type=int, default=10, help="Training images per person")
+    p.add_argument("--crowd", type=int, nargs="+", default=[1, 8, 24], help="Faces per classroom frame")
+    p.add_argument("--frames", type=int, default=20, help="Frames per crowd size")
+    p.add_argument("--threshold", type=float, default=70.0)
+    p.add_argument("--students", type=int, default=400)
+    p.add_argument("--subjects", type=int, default=5)
+    p.add_argument("--marks", type=int, default=10000, help="Marks per run (sized to take seconds)")
+    p.add_argument("--import-rows", type=int, default=100000, help="Rows imported per run")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--keep", action="store_true", help="Keep the scratch data directory")
+    args = p.parse_args()
+    args.repeats = max(1, args.repeats)
+
+    try:
+        stages = run(args)
+    finally:
+        db._pool.close_all()
+        if args.keep: print(f"[INFO] Scratch data kept in {WORK_DIR}")
+        else: shutil.rmtree(WORK_DIR, ignore_errors=True)
+    params = {k: v for k, v in vars(args).items() if k not in ("out", "baseline", "save_baseline", "tolerance", "keep", "faces")}
+    report = {"created": datetime.now().isoformat(timespec="seconds"), "machine": platform.platform(),
+              "python": platform.python_version(), "opencv": cv2.__version__, "params": params, "stages": stages}
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f: json.dump(report, f, indent=2)
+        print(f"[OK] Results written to {args.out}")
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f: json.dump(report, f, indent=2)
+        print(f"[OK] Baseline saved to {args.baseline}")
+        return
+    if not Path(args.baseline).exists():
+        print(f"[INFO] No baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("params") != params:
+        print("[INFO] Baseline was recorded with different parameters; rates may not be comparable")
+    slow = compare(stages, baseline, args.tolerance)
+    if slow:
+        print(f"[ERROR] Regressed past the baseline: {', '.join(slow)}")
+        sys.exit(1)
+    print("[OK] No stage regressed past the baseline")
+
+if __name__ == "__main__":
+    main()
@@ -9,10 +9,62 @@ MYSQL_CONFIG = {
     'database': 'attendance'
 }
 
-BASE_DATA_DIR = Path(__file__).resolve().parent / 'data'
+# Dataset, models, exports and the SQLite file live here (override to run against a scratch copy)
+BASE_DATA_DIR = Path(os.environ.get('ATTENDANCE_DATA_DIR', Path(__file__).resolve().parent / 'data'))
 DATASET_DIR = BASE_DATA_DIR / 'dataset'
 MODELS_DIR = BASE_DATA_DIR / 'models'
 AUTO_EXPORT_MASTER = BASE_DATA_DIR / 'attendance_master.csv'
 AUTO_EXPORT_DAILY = BASE_DATA_DIR / 'attendance_daily.csv'
+# Storage backend: 'mysql' (server) or 'sqlite' (single file, no server needed)
+DB_BACKEND = os.environ.get('ATTENDANCE_DB_BACKEND', 'mysql')
+SQLITE_PATH = Path(os.environ.get('ATTENDANCE_SQLITE_PATH', BASE_DATA_DIR / 'attendance.db'))
 os.makedirs(DATASET_DIR, exist_ok=True)
 os.makedirs(MODELS_DIR, exist_ok=True)
+
+# Training: processes used for image loading + face detection
+TRAIN_WORKERS = os.cpu_count() or 1
+# Training: size cap of the face-crop cache under MODELS_DIR
+CROP_CACHE_MAX_MB = 512
+
+# Face detector backend: 'haar', 'lbp' (faster cascade, a little less recall) or 'yunet'
+# (small CNN); see app.bench_detection --backends to compare them. Models that are neither
+# at these paths nor in OpenCV's data files are downloaded with: python -m app.detection --fetch lbp yunet
+DETECTOR_BACKEND = os.environ.get('ATTENDANCE_DETECTOR', 'haar')
+DETECTOR_MODELS = {
+    'haar': Path(__file__).resolve().parent.parent / 'haarcascade_frontalface_default.xml',
+    'lbp': MODELS_DIR / 'lbpcascade_frontalface_improved.xml',
+    'yunet': MODELS_DIR / 'face_detection_yunet_2023mar.onnx',
+}
+DETECTOR_URLS = {
+    'haar': 'https://raw.githubusercontent.com/opencv/opencv/4.x/data/haarcascades/haarcascade_frontalface_default.xml',
+    'lbp': 'https://raw.githubusercontent.com/opencv/opencv/4.x/data/lbpcascades/lbpcascade_frontalface_improved.xml',
+    'yunet': 'https://github.com/opencv/opencv_zoo/raw/main/models/face_detection_yunet/face_detection_yunet_2023mar.onnx',
+}
+
+# Face detection: smallest face wanted (frame pixels), the size such a face is shrunk to
+# before the detector runs (0 = detect at full resolution, the default: shrinking faster loses
+# faces; measure the FPS/recall trade-off on your footage with app.bench_detection before
+# setting e.g. 40), and regions of interest as
+# (x, y, w, h) frame pixels, e.g. [(0, 0, 320, 480)] for a doorway in the left half
+DETECT_MIN_FACE = 100
+DETECT_FACE_PX = 0
+DETECT_ROIS = []
+
+# Motion gate: detection is skipped while fewer than MOTION_MIN_CHANGED of the (downsampled)
+# pixels differ by more than MOTION_THRESHOLD grey levels from the last detected frame, with a
+# full detection forced every MOTION_FORCE_EVERY seconds
+MOTION_GATE = True
+MOTION_THRESHOLD = 25
+MOTION_MIN_CHANGED = 0.002
+MOTION_FORCE_EVERY = 5.0
+
+# Stage timing (app.metrics): off unless ATTENDANCE_METRICS=1 or --metrics; percentiles cover
+# the last METRICS_WINDOW samples of each stage
+METRICS_ENABLED = os.environ.get('ATTENDANCE_METRICS') == '1'
+METRICS_WINDOW = 1024
+
+# Database connection pool: max open connections, seconds before a connection is
+# replaced, and seconds to wait for a free one
+DB_POOL_SIZE = 5
+DB_POOL_RECYCLE = 3600
+DB_POOL_TIMEOUT = 30
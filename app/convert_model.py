@@ -0,0 +1,32 @@
+import argparse, time
+from pathlib import Path
+from .matcher import BatchLBPHMatcher, matrix_paths
+from .train_model import MODEL_PATH, BINARY_MODEL_PATH
+
+def convert(yaml_path: Path, out_path: Path) -> BatchLBPHMatcher:
+    t0 = time.perf_counter()
+    matcher = BatchLBPHMatcher.load(yaml_path)
+    t_read = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    matcher.save(out_path)
+    t_write = time.perf_counter() - t0
+    size = out_path.stat().st_size + sum(p.stat().st_size for p in matrix_paths(out_path))
+    print(f"[OK] {len(matcher)} samples: {yaml_path} ({yaml_path.stat().st_size / 2**20:.1f} MB, read in {t_read:.2f}s) "
+          f"-> {out_path} ({size / 2**20:.1f} MB, written in {t_write:.2f}s)")
+    return matcher
+
+def main():
+    p = argparse.ArgumentParser(description="Convert an LBPH YAML model to the binary, memory-mapped format")
+    p.add_argument("yaml", nargs="?", default=str(MODEL_PATH), help="OpenCV LBPH model file")
+    p.add_argument("--out", default=str(BINARY_MODEL_PATH), help="Binary model header (.npz); matrices go beside it")
+    args = p.parse_args()
+
+    yaml_path, out_path = Path(args.yaml), Path(args.out)
+    if not yaml_path.exists():
+        print(f"[ERROR] No model at {yaml_path}. Run train_model.py first."); return
+    if out_path.suffix != ".npz":
+        print("[ERROR] --out must end in .npz"); return
+    convert(yaml_path, out_path)
+
+if __name__ == "__main__":
+    main()
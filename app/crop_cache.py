@@ -0,0 +1,120 @@
+from __future__ import annotations
+import hashlib, json, os, time, numpy as np
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Optional
+
+class CropCache:
+    """Persistent cache of training face crops, so unchanged images skip face detection.
+
+    An entry is valid while the image's path, size and mtime match; a changed or moved
+    file is looked up again by content hash. Crops are stored once per
+    (content hash, detector signature) as .npy files next to ``index.json``.
+    """
+
+    def __init__(self, root: Path, detector_sig: str, max_bytes: int):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.root / "index.json"
+        self.detector_sig = detector_sig
+        self.max_bytes = max_bytes
+        self.hits = self.misses = self.evicted = 0
+        self._pending: Dict[str, dict] = {}
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+        # How many index entries share each crop file (identical images share one)
+        self._refs = Counter(e["key"] for e in self.index.values())
+
+    @staticmethod
+    def signature(model_path: str, **params) -> str:
+        """Digest of the detector model file contents and detection parameters."""
+        h = hashlib.sha1()
+        try:
+            with open(model_path, "rb") as f: h.update(f.read())
+        except OSError:
+            h.update(str(model_path).encode("utf-8"))
+        h.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+        return h.hexdigest()
+
+    def _blob(self, key: str) -> Path:
+        return self.root / f"{key}.npy"
+
+    def _set(self, name: str, record: dict) -> None:
+        self._refs[record["key"]] += 1  # before dropping the old entry, which may share the key
+        if name in self.index: self._unset(name)
+        self.index[name] = record
+
+    def _unset(self, name: str) -> None:
+        key = self.index.pop(name)["key"]
+        self._refs[key] -= 1
+        if self._refs[key] <= 0:
+            del self._refs[key]
+            self._blob(key).unlink(missing_ok=True)
+
+    def _load(self, key: str) -> Optional[np.ndarray]:
+        try:
+            return np.load(self._blob(key))
+        except (OSError, ValueError):
+            return None
+
+    def get(self, path: Path) -> Optional[np.ndarray]:
+        path = Path(path)
+        name = str(path)
+        try:
+            st = path.stat()
+        except OSError:
+            self.misses += 1
+            return None
+        entry = self.index.get(name)
+        if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns and entry["sig"] == self.detector_sig:
+            face = self._load(entry["key"])
+            if face is not None:
+                entry["used"] = time.time(); self.hits += 1
+                return face
+        try:
+            with open(path, "rb") as f:
+                digest = hashlib.sha1(f.read()).hexdigest()
+        except OSError:
+            self.misses += 1
+            return None
+        key = hashlib.sha1(f"{digest}:{self.detector_sig}".encode("utf-8")).hexdigest()
+        record = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha1": digest, "sig": self.detector_sig,
+                  "key": key, "used": time.time()}
+        face = self._load(key) if key in self._refs else None
+        if face is not None:
+            record["bytes"] = self._blob(key).stat().st_size
+            self._set(name, record); self.hits += 1
+            return face
+        self._pending[name] = record; self.misses += 1
+        return None
+
+    def put(self, path: Path, face: np.ndarray) -> None:
+        name = str(path)
+        record = self._pending.pop(name, None)
+        if record is None: return
+        blob = self._blob(record["key"])
+        np.save(blob, np.ascontiguousarray(face))
+        record["bytes"] = blob.stat().st_size
+        self._set(name, record)
+
+    def prune(self) -> None:
+        """Evict entries for deleted images, then least recently used ones down to ``max_bytes``."""
+        for name in [n for n in self.index if not os.path.exists(n)]:
+            self._unset(name); self.evicted += 1
+        sizes = {e["key"]: e.get("bytes", 0) for e in self.index.values()}
+        total = sum(sizes.values())
+        for name in sorted(self.index, key=lambda n: self.index[n]["used"]):
+            if total <= self.max_bytes: break
+            key = self.index[name]["key"]
+            self._unset(name); self.evicted += 1
+            if key not in self._refs: total -= sizes[key]
+
+    def save(self) -> None:
+        self.prune()
+        tmp = self.index_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.index, f)
+        os.replace(tmp, self.index_path)
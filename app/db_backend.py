@@ -0,0 +1,217 @@
+from __future__ import annotations
+import sqlite3
+from datetime import date, datetime
+
+MYSQL_DDL = [
+    """CREATE TABLE IF NOT EXISTS users (
+        person_id VARCHAR(255) PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        role ENUM('admin','student') NOT NULL,
+        password_hash VARCHAR(255) NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS subjects (
+        subject_id VARCHAR(255) PRIMARY KEY,
+        name VARCHAR(255) NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS attendance (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        person_id VARCHAR(255) NOT NULL,
+        subject_id VARCHAR(255) NOT NULL,
+        ts DATETIME NOT NULL,
+        day DATE NOT NULL,
+        UNIQUE KEY unique_attendance (person_id, subject_id, day),
+        FOREIGN KEY (person_id) REFERENCES users(person_id),
+        FOREIGN KEY (subject_id) REFERENCES subjects(subject_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS queries (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        person_id VARCHAR(255) NOT NULL,
+        query_text TEXT NOT NULL,
+        ts DATETIME NOT NULL,
+        status ENUM('pending','resolved') NOT NULL DEFAULT 'pending',
+        FOREIGN KEY (person_id) REFERENCES users(person_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS schema_version (
+        version INT PRIMARY KEY,
+        description VARCHAR(255) NOT NULL,
+        applied_at DATETIME NOT NULL
+    )"""
+]
+
+MYSQL_STATS_DDL = [
+    """CREATE TABLE IF NOT EXISTS attendance_counts (
+        person_id VARCHAR(255) NOT NULL,
+        subject_id VARCHAR(255) NOT NULL,
+        present_days INT NOT NULL,
+        PRIMARY KEY (person_id, subject_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS subject_days (
+        subject_id VARCHAR(255) NOT NULL,
+        day DATE NOT NULL,
+        marks INT NOT NULL,
+        PRIMARY KEY (subject_id, day)
+    )"""
+]
+
+# Same tables (indexes come from the migrations in attendance_db); TIMESTAMP/DATE column types let sqlite3 hand back datetime/date like MySQL does,
+# and AUTOINCREMENT keeps ids increasing (the CSV export resumes from the last id it saw)
+SQLITE_DDL = [
+    """CREATE TABLE IF NOT EXISTS users (
+        person_id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        role TEXT NOT NULL CHECK (role IN ('admin','student')),
+        password_hash TEXT NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS subjects (
+        subject_id TEXT PRIMARY KEY,
+        name TEXT NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS attendance (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        person_id TEXT NOT NULL REFERENCES users(person_id),
+        subject_id TEXT NOT NULL REFERENCES subjects(subject_id),
+        ts TIMESTAMP NOT NULL,
+        day DATE NOT NULL,
+        UNIQUE (person_id, subject_id, day)
+    )""",
+    """CREATE TABLE IF NOT EXISTS queries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        person_id TEXT NOT NULL REFERENCES users(person_id),
+        query_text TEXT NOT NULL,
+        ts TIMESTAMP NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending','resolved'))
+    )""",
+    """CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        applied_at TIMESTAMP NOT NULL
+    )""",
+]
+
+SQLITE_STATS_DDL = [
+    """CREATE TABLE IF NOT EXISTS attendance_counts (
+        person_id TEXT NOT NULL,
+        subject_id TEXT NOT NULL,
+        present_days INTEGER NOT NULL,
+        PRIMARY KEY (person_id, subject_id)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS subject_days (
+        subject_id TEXT NOT NULL,
+        day DATE NOT NULL,
+        marks INTEGER NOT NULL,
+        PRIMARY KEY (subject_id, day)
+    ) WITHOUT ROWID""",
+]
+
+class MySQLBackend:
+    """mysql.connector, the server-backed store."""
+
+    name = 'mysql'
+    ddl = MYSQL_DDL
+    stats_ddl = MYSQL_STATS_DDL
+    explain = "EXPLAIN "
+
+    def __init__(self, config: dict):
+        import mysql.connector
+        self._mysql = mysql.connector
+        self.config = config
+        self.IntegrityError = mysql.connector.errors.IntegrityError
+        # Errors after which the connection is not reused
+        self.disconnect_errors = (mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError)
+
+    def connect(self):
+        return self._mysql.connect(**self.config)
+
+    def ping(self, conn) -> bool:
+        return conn.is_connected()
+
+    def cursor(self, conn):
+        return conn.cursor()
+
+    def create_index(self, cursor, name: str, table: str, cols: str) -> None:
+        # MySQL has no CREATE INDEX IF NOT EXISTS
+        cursor.execute("SELECT COUNT(*) FROM information_schema.statistics "
+                       "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s", (table, name))
+        if not cursor.fetchone()[0]:
+            cursor.execute(f"CREATE INDEX {name} ON {table}({cols})")
+
+    def upsert(self, table: str, cols, key: str, updates: dict) -> str:
+        """INSERT that updates ``updates`` on a ``key`` clash: column -> SQL expression, where ``{new}``
+        stands for the value being inserted (None means just ``{new}``)."""
+        sets = ", ".join(f"{c}={(expr or '{new}').format(new=f'VALUES({c})')}" for c, expr in updates.items())
+        return f"INSERT INTO {table}({', '.join(cols)}) VALUES ({','.join(['%s'] * len(cols))}) ON DUPLICATE KEY UPDATE {sets}"
+
+class _SQLiteCursor:
+    """Cursor taking the ``%s`` placeholders used throughout attendance_db."""
+
+    _translated = {}
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    @classmethod
+    def _sql(cls, query: str) -> str:
+        sql = cls._translated.get(query)
+        if sql is None:
+            sql = cls._translated[query] = query.replace('%s', '?').replace('INSERT IGNORE', 'INSERT OR IGNORE')
+        return sql
+
+    def execute(self, query, params=()):
+        return self._cursor.execute(self._sql(query), params)
+
+    def executemany(self, query, seq):
+        return self._cursor.executemany(self._sql(query), seq)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+class SQLiteBackend:
+    """In-process SQLite store in WAL mode, for single-machine setups.
+
+    Statements are always parameterised and sqlite3 keeps them prepared in a per-connection
+    cache, so repeated queries skip parsing.
+    """
+
+    name = 'sqlite'
+    ddl = SQLITE_DDL
+    stats_ddl = SQLITE_STATS_DDL
+    explain = "EXPLAIN QUERY PLAN "
+    IntegrityError = sqlite3.IntegrityError
+    disconnect_errors = (sqlite3.InterfaceError, sqlite3.ProgrammingError)
+
+    def __init__(self, path):
+        self.path = str(path)
+        # Explicit converters: MySQL DATETIME keeps whole seconds, so stored timestamps do too
+        sqlite3.register_adapter(datetime, lambda v: v.isoformat(' ', 'seconds'))
+        sqlite3.register_adapter(date, lambda v: v.isoformat())
+        sqlite3.register_converter('TIMESTAMP', lambda b: datetime.fromisoformat(b.decode()))
+        sqlite3.register_converter('DATE', lambda b: date.fromisoformat(b.decode()))
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, detect_types=sqlite3.PARSE_DECLTYPES,
+                               check_same_thread=False, cached_statements=256)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def ping(self, conn) -> bool:
+        conn.execute("SELECT 1")
+        return True
+
+    def cursor(self, conn):
+        return _SQLiteCursor(conn.cursor())
+
+    def create_index(self, cursor, name: str, table: str, cols: str) -> None:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({cols})")
+
+    def upsert(self, table: str, cols, key: str, updates: dict) -> str:
+        sets = ", ".join(f"{c}={(expr or '{new}').format(new=f'excluded.{c}')}" for c, expr in updates.items())
+        return f"INSERT INTO {table}({', '.join(cols)}) VALUES ({','.join(['%s'] * len(cols))}) ON CONFLICT({key}) DO UPDATE SET {sets}"
+
+def get_backend(name: str, mysql_config: dict, sqlite_path):
+    if name == 'mysql':
+        return MySQLBackend(mysql_config)
+    if name == 'sqlite':
+        return SQLiteBackend(sqlite_path)
+    raise ValueError(f"Unknown DB_BACKEND {name!r} (expected 'mysql' or 'sqlite')")
@@ -0,0 +1,146 @@
+import argparse, os, urllib.request, cv2, numpy as np
+from pathlib import Path
+from .config import DETECTOR_BACKEND, DETECTOR_MODELS, DETECTOR_URLS, DETECT_MIN_FACE, DETECT_FACE_PX, DETECT_ROIS
+from .tracker import iou
+
+def parse_roi(spec: str):
+    """'x,y,w,h' (frame pixels) -> (x, y, w, h)."""
+    x, y, w, h = (int(v) for v in spec.split(","))
+    if w <= 0 or h <= 0:
+        raise ValueError(f"ROI needs a positive size: {spec!r}")
+    return x, y, w, h
+
+def model_path(backend: str) -> Path:
+    """The configured model file for ``backend``; cascades fall back to OpenCV's bundled data files."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown detector backend {backend!r}; choose from {', '.join(BACKENDS)}")
+    path = Path(DETECTOR_MODELS[backend])
+    if not path.exists() and backend != "yunet":
+        data_dir = Path(cv2.data.haarcascades)
+        for bundled in (data_dir / path.name, data_dir.parent / "lbpcascades" / path.name):
+            if bundled.exists(): return bundled
+    return path
+
+def available_backends(report: bool = False):
+    """Backends whose model file is present; ``report`` prints how to fetch the others."""
+    names = [name for name in BACKENDS if model_path(name).exists()]
+    if report:
+        for name in BACKENDS:
+            if name not in names:
+                print(f"[INFO] {name} unavailable: {missing_hint(name)}")
+    return names
+
+def missing_hint(backend: str) -> str:
+    return f"no model at {DETECTOR_MODELS[backend]}; run: python -m app.detection --fetch {backend}"
+
+def fetch_model(backend: str, force: bool = False) -> Path:
+    """Download ``backend``'s model from ``DETECTOR_URLS`` to its ``DETECTOR_MODELS`` path."""
+    path = model_path(backend)
+    if path.exists() and not force:
+        return path
+    path = Path(DETECTOR_MODELS[backend])
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".part")
+    with urllib.request.urlopen(DETECTOR_URLS[backend], timeout=60) as resp, open(tmp, "wb") as f:
+        f.write(resp.read())
+    os.replace(tmp, path)
+    return path
+
+class CascadeBackend:
+    """Haar or LBP cascade (same OpenCV API, different model file)."""
+
+    def __init__(self, path: Path, scale_factor: float = 1.1, min_neighbors: int = 5):
+        if not path.exists():
+            raise RuntimeError(f"Cascade missing: {path}")
+        self.cascade = cv2.CascadeClassifier(str(path))
+        if self.cascade.empty():
+            raise RuntimeError(f"Cannot load cascade {path}")
+        self.scale_factor, self.min_neighbors = scale_factor, min_neighbors
+
+    def __call__(self, gray, min_size: int):
+        return self.cascade.detectMultiScale(gray, self.scale_factor, self.min_neighbors, minSize=(min_size, min_size))
+
+class YuNetBackend:
+    """OpenCV's YuNet CNN face detector (``cv2.FaceDetectorYN``)."""
+
+    def __init__(self, path: Path, score_threshold: float = 0.8, nms_threshold: float = 0.3, **_):
+        if not path.exists():
+            raise RuntimeError(f"YuNet model missing: {path}")
+        self.net = cv2.FaceDetectorYN.create(str(path), "", (320, 320), score_threshold, nms_threshold)
+
+    def __call__(self, gray, min_size: int):
+        h, w = gray.shape[:2]
+        self.net.setInputSize((w, h))
+        _, faces = self.net.detect(cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR))
+        if faces is None: return []
+        return [(x, y, bw, bh) for x, y, bw, bh in faces[:, :4].round().astype(int) if min(bw, bh) >= min_size]
+
+BACKENDS = {"haar": CascadeBackend, "lbp": CascadeBackend, "yunet": YuNetBackend}
+
+class FaceDetector:
+    """Face detector run on a downscaled copy of the frame, optionally only inside regions of interest.
+
+    ``backend`` picks the model (``DETECTOR_BACKEND``, see ``BACKENDS``). Faces smaller than
+    ``min_face`` pixels are not wanted, so the frame is shrunk until such a face is ``face_px``
+    pixels (the Haar window is 24) and the pyramid levels below that are never computed. Boxes
+    are mapped back to full-resolution coordinates, so callers crop the faces for recognition
+    from the original gray frame. ``face_px`` 0 or None, the ``DETECT_FACE_PX`` default, disables downscaling.
+    """
+
+    def __init__(self, backend: str = None, scale_factor: float = 1.1, min_neighbors: int = 5,
+                 min_face: int = DETECT_MIN_FACE, face_px: int = DETECT_FACE_PX, rois=None):
+        self.backend = backend or DETECTOR_BACKEND
+        self.model_path = model_path(self.backend)
+        if not self.model_path.exists():
+            raise RuntimeError(f"{self.backend} detector unavailable: {missing_hint(self.backend)}")
+        self._detect = BACKENDS[self.backend](self.model_path, scale_factor=scale_factor, min_neighbors=min_neighbors)
+        self.min_face = min_face
+        self.scale = min(1.0, face_px / float(min_face)) if face_px else 1.0
+        self.rois = list(DETECT_ROIS if rois is None else rois)
+
+    def _regions(self, shape, rois=None):
+        fh, fw = shape[:2]
+        bounds = self.rois or [(0, 0, fw, fh)]
+        if rois is not None:
+            # Per-call regions (e.g. where the scene changed), kept inside the configured ROIs
+            bounds = [(max(x, bx), max(y, by), min(x + w, bx + bw) - max(x, bx), min(y + h, by + bh) - max(y, by))
+                      for (x, y, w, h) in rois for (bx, by, bw, bh) in bounds]
+        regions = []
+        for (x, y, w, h) in bounds:
+            x0, y0, x1, y1 = max(0, x), max(0, y), min(fw, x + w), min(fh, y + h)
+            if x1 - x0 >= self.min_face and y1 - y0 >= self.min_face:
+                regions.append((x0, y0, x1 - x0, y1 - y0))
+        return regions
+
+    def detect(self, gray: np.ndarray, rois=None) -> np.ndarray:
+        """Face boxes (x, y, w, h) in ``gray``'s coordinates, as an (N, 4) int array.
+        ``rois`` narrows this call to those regions."""
+        boxes = []
+        for (rx, ry, rw, rh) in self._regions(gray.shape, rois):
+            region = gray[ry:ry+rh, rx:rx+rw]
+            if self.scale < 1.0:
+                size = (max(1, round(rw * self.scale)), max(1, round(rh * self.scale)))
+                region = cv2.resize(region, size, interpolation=cv2.INTER_AREA)
+            for (x, y, w, h) in self._detect(region, max(1, int(self.min_face * self.scale))):
+                bx, by = max(rx, rx + round(x / self.scale)), max(ry, ry + round(y / self.scale))
+                box = (bx, by, min(round(w / self.scale), rx + rw - bx), min(round(h / self.scale), ry + rh - by))
+                # Overlapping ROIs can both see the same face
+                if not any(iou(box, b) > 0.5 for b in boxes):
+                    boxes.append(box)
+        return np.array(boxes, dtype=np.int32).reshape(-1, 4)
+
+def main():
+    p = argparse.ArgumentParser(description="List the face detector backends or download their models")
+    p.add_argument("--fetch", nargs="+", choices=list(BACKENDS), metavar="BACKEND",
+                   help=f"Download these models ({', '.join(BACKENDS)}) to their DETECTOR_MODELS paths")
+    p.add_argument("--force", action="store_true", help="Download again even if the file exists")
+    args = p.parse_args()
+    for backend in args.fetch or []:
+        try:
+            print(f"[OK] {backend}: {fetch_model(backend, args.force)}")
+        except OSError as e:
+            print(f"[ERROR] {backend}: cannot download {DETECTOR_URLS[backend]}: {e}")
+    print(f"[INFO] Available backends: {', '.join(available_backends(report=True)) or 'none'}")
+
+if __name__ == "__main__":
+    main()
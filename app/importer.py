@@ -0,0 +1,144 @@
+import argparse, csv, threading, time
+from datetime import date, datetime
+from pathlib import Path
+from .attendance_db import bulk_import_attendance
+
+def iter_rows(path: Path):
+    """Row tuples of the first sheet of an .xlsx, or of a .csv, read one at a time."""
+    suffix = path.suffix.lower()
+    if suffix == '.csv':
+        with open(path, 'r', newline='', encoding='utf-8-sig') as f:
+            yield from map(tuple, csv.reader(f))
+    elif suffix in ('.xlsx', '.xlsm'):
+        import openpyxl
+        wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            yield from wb.active.iter_rows(values_only=True)
+        finally:
+            wb.close()
+    else:
+        raise ValueError(f"Unsupported file type '{path.suffix}': use .xlsx or .csv")
+
+def count_rows(path: Path):
+    """Row count for progress, or None if it cannot be known without reading the whole sheet."""
+    suffix = path.suffix.lower()
+    if suffix == '.csv':
+        n, last = 0, b'\n'
+        with open(path, 'rb') as f:
+            while block := f.read(1 << 20):
+                n += block.count(b'\n'); last = block[-1:]
+        return n + (last != b'\n')
+    if suffix not in ('.xlsx', '.xlsm'):
+        return None
+    import openpyxl
+    wb = openpyxl.load_workbook(path, read_only=True)
+    try:
+        return wb.active.max_row  # from the sheet's dimension tag; None when the writer left it out
+    finally:
+        wb.close()
+
+def parse_row(row):
+    """(person_id, subject_id, date) from columns A-C, or None for a header/invalid row."""
+    if len(row) < 3 or not all(row[:3]):
+        return None
+    try:
+        person_id = str(row[0]).strip()
+        subject_id = str(row[1]).strip()
+        if isinstance(row[2], datetime):
+            att_date = row[2].date()
+        elif isinstance(row[2], date):
+            att_date = row[2]
+        else:
+            att_date = datetime.strptime(str(row[2]).strip(), "%Y-%m-%d").date()
+    except ValueError:
+        return None
+    return person_id, subject_id, att_date
+
+class ImportJob:
+    """Imports an attendance file on a worker thread, ``chunk_size`` rows per transaction.
+
+    Progress counters can be read from any thread while it runs. ``cancel`` stops reading;
+    chunks already written stay imported.
+    """
+
+    def __init__(self, path, chunk_size: int = 1000):
+        self.path = Path(path)
+        self.chunk_size = chunk_size
+        self.total = None          # rows in the file, when known
+        self.rows_read = 0
+        self.skipped = 0           # header and invalid rows
+        self.success = self.duplicates = self.n_errors = 0
+        self.errors = []
+        self.error = None          # exception that stopped the import
+        self.cancelled = False
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="attendance-import", daemon=True)
+
+    def start(self) -> "ImportJob":
+        self._thread.start()
+        return self
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    @property
+    def done(self) -> bool:
+        return self._thread.ident is not None and not self._thread.is_alive()
+
+    def join(self, timeout: float = None) -> None:
+        self._thread.join(timeout)
+
+    def _records(self):
+        for row in iter_rows(self.path):
+            if self._cancel.is_set():
+                self.cancelled = True
+                return
+            self.rows_read += 1
+            record = parse_row(row)
+            if record is None: self.skipped += 1
+            else: yield record
+
+    def _on_chunk(self, success, duplicates, n_errors):
+        self.success, self.duplicates, self.n_errors = success, duplicates, n_errors
+
+    def _run(self):
+        try:
+            self.total = count_rows(self.path)
+            self.success, self.duplicates, self.errors = bulk_import_attendance(
+                self._records(), self.chunk_size, on_chunk=self._on_chunk)
+            self.n_errors = len(self.errors)
+        except Exception as e:
+            self.error = e
+
+    def report(self) -> str:
+        lines = [f"✓ Successfully imported: {self.success} records",
+                 f"⚠ Duplicates skipped: {self.duplicates} records",
+                 f"⚠ Invalid rows skipped: {self.skipped} rows"]
+        if self.cancelled:
+            lines.append(f"\nCancelled after {self.rows_read} rows; records before that were kept.")
+        if self.error:
+            lines.append(f"\nImport stopped: {self.error}")
+        if self.errors:
+            lines.append(f"\nErrors ({len(self.errors)}):")
+            lines += [f"  • {err}" for err in self.errors[:10]]  # Show first 10 errors
+        return "\n".join(lines)
+
+def main():
+    p = argparse.ArgumentParser(description="Import attendance from an .xlsx or .csv file (person_id, subject_id, YYYY-MM-DD)")
+    p.add_argument("path")
+    p.add_argument("--chunk-size", type=int, default=1000)
+    args = p.parse_args()
+
+    job = ImportJob(args.path, args.chunk_size).start()
+    t0 = time.perf_counter()
+    try:
+        while not job.done:
+            job.join(1.0)
+            print(f"[INFO] {job.rows_read}/{job.total or '?'} rows read, {job.success} imported", flush=True)
+    except KeyboardInterrupt:
+        job.cancel(); job.join()
+    print(job.report())
+    print(f"[TIME] {job.rows_read} rows in {time.perf_counter() - t0:.1f}s")
+
+if __name__ == "__main__":
+    main()
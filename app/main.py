@@ -1,18 +1,24 @@
-import subprocess, sys, tkinter as tk
+import importlib.util, subprocess, sys, threading, time, tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from pathlib import Path
 from datetime import datetime, date
-from .attendance_db import init_db, ensure_default_admin, verify_login, upsert_student, add_subject, list_subjects, list_students, list_attendance, list_attendance_by_person, insert_query, list_queries, update_query_status, update_student, get_attendance_summary, update_attendance_status, add_manual_attendance, get_detailed_attendance_stats, bulk_import_attendance
 from .config import AUTO_EXPORT_MASTER, AUTO_EXPORT_DAILY
+from .paged_table import PagedTreeview
+from .worker import TaskWorker
 
-THIS_DIR = Path(__file__).resolve().parent
+T_START = time.perf_counter()
 
-def run_py(script, *args):
-    cmd = [sys.executable, '-m', f'app.{Path(script).stem}', *args]
-    try:
-        subprocess.run(cmd, check=True, cwd=THIS_DIR.parent)
-    except subprocess.CalledProcessError as e:
-        messagebox.showerror("Error", f"Command failed:\n{' '.join(cmd)}\n\n{e}")
+def _lazy(name):
+    """``app.<name>``, imported on first attribute access rather than now."""
+    spec = importlib.util.find_spec(f"{__package__}.{name}")
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+# The DB stack (and mysql.connector with it) loads once the window is up
+db = _lazy("attendance_db")
 
 class ModernStyle:
     # Color palette
@@ -114,9 +120,106 @@ class App(tk.Tk):
         self.geometry("1100x700")
         self.configure(bg=ModernStyle.BACKGROUND)
         ModernStyle.configure_styles()
-        init_db(); ensure_default_admin()
+        self.worker = None
+        self._tasks = {}  # task_id -> event handler of its progress window
+        self._live = {}  # task_id -> title of running tasks that only end when the user stops them
+        self._db_thread, self._db_error = None, None
+        self.protocol("WM_DELETE_WINDOW", self._quit)
 
         self._login_view()
+        # Let the login screen map and paint first; the DB and the worker's imports happen behind it
+        self.after(20, self._start_backend)
+
+    def _start_backend(self):
+        # A slow or unreachable MySQL server must not freeze the login screen, so the DB opens on a thread
+        def open_db():
+            try: db.init_db(); db.ensure_default_admin()
+            except Exception as e: self._db_error = e
+        self._db_thread = threading.Thread(target=open_db, name="db-init", daemon=True)
+        self._db_thread.start()
+        self.worker = TaskWorker().start()
+        self._poll_worker()
+        self._poll_db()
+
+    def _poll_db(self):
+        if self._db_thread.is_alive():
+            self.after(50, self._poll_db); return
+        if self._db_error:
+            messagebox.showerror("Database Error", f"Cannot open the attendance database:\n{self._db_error}")
+        else:
+            print(f"[TIME] Login screen up and database ready {time.perf_counter() - T_START:.2f}s after app.main loaded")
+
+    def _db_ready(self):
+        """False, after telling the user why, while the database is still opening or failed to open."""
+        if self._db_thread is None or self._db_thread.is_alive():
+            messagebox.showinfo("Please wait", "Still connecting to the database, try again in a moment.")
+            return False
+        if self._db_error:
+            messagebox.showerror("Database Error", f"Cannot open the attendance database:\n{self._db_error}")
+            return False
+        return True
+
+    def _poll_worker(self):
+        self.after(100, self._poll_worker)
+        for kind, task_id, payload in self.worker.events():
+            if kind == "ready": print(f"[TIME] Worker ready in {payload:.2f}s")
+            handler = self._tasks.get(task_id)
+            if handler: handler(kind, payload)
+
+    def _run_task(self, title, script, *args, hint="", live=False):
+        """Run ``app.<script>`` in the worker process, with a window showing its latest output.
+        ``live`` tasks run until the user stops them; nothing else is started meanwhile, since the
+        worker runs one task at a time and it would wait behind them indefinitely."""
+        if self._live:
+            messagebox.showwarning("Busy", f"{next(iter(self._live.values()))} is running. Stop it first "
+                                           "(press Q in its camera window), then try again.")
+            return
+        d = tk.Toplevel(self)
+        d.title(title)
+        d.geometry("520x170")
+        d.configure(bg=ModernStyle.BACKGROUND)
+        card = ttk.Frame(d, style='Card.TFrame', padding=20)
+        card.pack(fill='both', expand=True, padx=20, pady=20)
+        ttk.Label(card, text=title, font=('Segoe UI', 12, 'bold'), background=ModernStyle.SURFACE).pack(anchor='w', pady=(0, 10))
+        progress = ttk.Progressbar(card, mode='indeterminate')
+        progress.pack(fill='x', pady=(0, 6))
+        progress.start(15)
+        status = ttk.Label(card, text="Queued behind the running task..." if self.worker.pending else "Starting...",
+                           style='Card.TLabel')
+        status.pack(anchor='w')
+        submitted = time.perf_counter()
+
+        def on_event(kind, payload):
+            if kind in ("started", "line"):
+                if kind == "started":
+                    print(f"[TIME] {script} started {1000 * (time.perf_counter() - submitted):.0f} ms after the click")
+                    payload = hint or "Running..."
+                if d.winfo_exists(): status.config(text=payload[:80])
+                return
+            del self._tasks[task_id]
+            self._live.pop(task_id, None)
+            if d.winfo_exists(): d.destroy()
+            if kind == "error":
+                messagebox.showerror("Error", f"{title} failed:\n\n{payload}")
+            else:
+                self._refresh_attendance()
+
+        task_id = self.worker.submit(script, *args)
+        self._tasks[task_id] = on_event
+        if live: self._live[task_id] = title
+
+    def _export_csvs(self, full=False):
+        """Bring the CSV exports up to date off the UI thread. Deleted or edited records need
+        ``full``: the incremental export only adds rows."""
+        def run():
+            from . import auto_export
+            try: (auto_export.export_all if full else auto_export.export_incremental)()
+            except Exception as e: print(f"[ERROR] CSV export failed: {e}")
+        threading.Thread(target=run, name="csv-export", daemon=True).start()
+
+    def _quit(self):
+        if self.worker: self.worker.close()
+        self.destroy()
 
     def _login_view(self):
         for w in self.winfo_children(): w.destroy()
@@ -154,8 +257,9 @@ class App(tk.Tk):
         self.e_pwd.grid(row=6, column=0, columnspan=2, pady=(0, 24), ipady=8)
         
         def do_login():
+            if not self._db_ready(): return
             uid = self.e_uid.get().strip(); pw = self.e_pwd.get().strip()
-            user = verify_login(uid, pw)
+            user = db.verify_login(uid, pw)
             if not user:
                 messagebox.showerror("Login Failed", "Invalid credentials")
                 return
@@ -202,7 +306,7 @@ class App(tk.Tk):
         actions = [
             ("👤 Add Student", self._add_student_dialog),
             ("📸 Register Faces", self._register_faces_dialog),
-            ("🤖 Train Model", lambda: run_py('train_model.py')),
+            ("🤖 Train Model", lambda: self._run_task("Train Model", "train_model", "--incremental")),
             ("📋 List Students", self._list_students_dialog),
             ("💬 View Queries", self._view_queries_dialog),
         ]
@@ -221,7 +325,7 @@ class App(tk.Tk):
             ("✏️ Edit Attendance", self._edit_attendance_dialog),
             ("📊 View Statistics", self._view_statistics_dialog),
             ("📥 Import from Excel", self._import_excel_dialog),
-            ("🔄 Refresh Table", self._refresh_attendance),
+            ("🔄 Refresh Table", self._reload_attendance),
             ("📊 Open Master CSV", lambda: self._open_csv(AUTO_EXPORT_MASTER)),
             ("📈 Open Daily CSV", lambda: self._open_csv(AUTO_EXPORT_DAILY)),
         ]
@@ -252,7 +356,9 @@ class App(tk.Tk):
         # Scrollbars
         vsb = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
         hsb = ttk.Scrollbar(table_frame, orient="horizontal", command=self.tree.xview)
-        self.tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+        self.tree.configure(xscrollcommand=hsb.set)
+        # Newest records first; older pages load as the table is scrolled down
+        self.attendance_table = PagedTreeview(self.tree, vsb, db.list_attendance_page)
         
         self.tree.grid(row=0, column=0, sticky='nsew')
         vsb.grid(row=0, column=1, sticky='ns')
@@ -261,7 +367,7 @@ class App(tk.Tk):
         table_frame.grid_rowconfigure(0, weight=1)
         table_frame.grid_columnconfigure(0, weight=1)
         
-        self._refresh_attendance()
+        self.attendance_table.reload()
         self._auto_refresh_attendance()
 
     def _logout_from_admin(self):
@@ -316,7 +422,7 @@ class App(tk.Tk):
             tree.column(c, width=200, anchor="center")
         tree.pack(fill="both", expand=True)
         
-        for row in get_attendance_summary(pid):
+        for row in db.get_attendance_summary(pid):
             tree.insert("", "end", values=row)
         
         # Raise Query Tab
@@ -334,7 +440,7 @@ class App(tk.Tk):
             if not q:
                 messagebox.showwarning("Empty Query", "Please enter a query before submitting.")
                 return
-            insert_query(pid, q)
+            db.insert_query(pid, q)
             messagebox.showinfo("Submitted", "Your query has been submitted successfully.")
             query_text.delete("1.0", "end")
         
@@ -359,7 +465,8 @@ class App(tk.Tk):
             if not new_name:
                 messagebox.showwarning("Invalid Name", "Name cannot be empty.")
                 return
-            update_student(pid, new_name)
+            db.update_student(pid, new_name)
+            self._export_csvs(full=True)  # the name is in every exported row
             messagebox.showinfo("Saved", "Profile updated successfully.")
             self._student_view(pid, new_name)
         
@@ -387,7 +494,8 @@ class App(tk.Tk):
         def go():
             pid = e1.get().strip(); nm = e2.get().strip()
             if not pid or not nm: messagebox.showwarning("Missing", "Please enter both Person ID and Name"); return
-            upsert_student(pid, nm)
+            db.upsert_student(pid, nm)
+            self._export_csvs(full=True)  # may have renamed an existing student
             messagebox.showinfo("Success", "Student added successfully"); d.destroy()
         
         btn_frame = ttk.Frame(card, style='Card.TFrame')
@@ -423,7 +531,8 @@ class App(tk.Tk):
             pid = e1.get().strip(); nm = e2.get().strip(); cam = e3.get().strip()
             if not pid or not nm: messagebox.showwarning("Missing", "Enter both Person ID and Name"); return
             d.destroy()
-            run_py('register_faces.py', '--person-id', pid, '--name', nm, '--camera-index', cam)
+            self._run_task("Register Faces", "register_faces", '--person-id', pid, '--name', nm, '--camera-index', cam,
+                           hint="SPACE captures a face, Q stops (in the camera window)")
         
         btn_frame = ttk.Frame(card, style='Card.TFrame')
         btn_frame.grid(row=7, column=0, columnspan=2, sticky='ew')
@@ -452,7 +561,8 @@ class App(tk.Tk):
         def go():
             sid = e1.get().strip(); nm = e2.get().strip()
             if not sid or not nm: messagebox.showwarning("Missing", "Please enter both fields"); return
-            add_subject(sid, nm); messagebox.showinfo("Success","Subject added successfully"); d.destroy()
+            db.add_subject(sid, nm); self._export_csvs(full=True)  # may have renamed a subject
+            messagebox.showinfo("Success","Subject added successfully"); d.destroy()
         
         btn_frame = ttk.Frame(card, style='Card.TFrame')
         btn_frame.grid(row=5, column=0, columnspan=2, sticky='ew')
@@ -477,7 +587,7 @@ class App(tk.Tk):
             tree.column(c, width=250, anchor="center")
         tree.pack(fill="both", expand=True)
         
-        for row in list_students():
+        for row in db.list_students():
             tree.insert("", "end", values=row)
 
     def _view_queries_dialog(self):
@@ -499,7 +609,7 @@ class App(tk.Tk):
             tree.column(c, width=col_widths.get(c, 100), anchor="center")
         tree.pack(fill="both", expand=True, pady=(0, 16))
         
-        for row in list_queries():
+        for row in db.list_queries():
             tree.insert("", "end", values=row)
         
         def mark_resolved():
@@ -509,7 +619,7 @@ class App(tk.Tk):
                 return
             item = tree.item(selected[0])
             qid = item['values'][0]
-            update_query_status(qid, 'resolved')
+            db.update_query_status(qid, 'resolved')
             tree.item(selected[0], values=(item['values'][0], item['values'][1], item['values'][2], item['values'][3], item['values'][4], 'resolved'))
             messagebox.showinfo("Updated", "Query marked as resolved.")
         
@@ -527,7 +637,7 @@ class App(tk.Tk):
         ttk.Label(card, text="Start Attendance", font=('Segoe UI', 14, 'bold'), background=ModernStyle.SURFACE).grid(row=0, column=0, columnspan=2, pady=(0, 20), sticky='w')
         
         ttk.Label(card, text="Select Subject", style='Card.TLabel').grid(row=1, column=0, columnspan=2, sticky="w", pady=(0, 6))
-        subs = list_subjects()
+        subs = db.list_subjects()
         sid_var = tk.StringVar(value=subs[0][0] if subs else "")
         combo = ttk.Combobox(card, textvariable=sid_var, values=[s[0] for s in subs], state="readonly", width=32, font=('Segoe UI', 10))
         combo.grid(row=2, column=0, columnspan=2, pady=(0, 12), ipady=6)
@@ -542,7 +652,8 @@ class App(tk.Tk):
             if not sid: messagebox.showwarning("Missing","Please add a subject first"); return
             camera_index = cam.get()
             d.destroy()
-            run_py('recognize_and_mark.py','--subject-id', sid, '--camera-index', camera_index)
+            self._run_task("Attendance", "recognize_and_mark", '--subject-id', sid, '--camera-index', camera_index,
+                           hint="Recognizing, press Q in the camera window to stop", live=True)
         
         btn_frame = ttk.Frame(card, style='Card.TFrame')
         btn_frame.grid(row=5, column=0, columnspan=2, sticky='ew')
@@ -562,9 +673,11 @@ class App(tk.Tk):
             messagebox.showerror("Error", str(e))
 
     def _refresh_attendance(self):
-        for i in self.tree.get_children(): self.tree.delete(i)
-        for row in list_attendance():
-            self.tree.insert("", "end", values=row)
+        # Only fetches records newer than the newest one shown
+        if getattr(self, '_admin_active', False): self.attendance_table.refresh()
+
+    def _reload_attendance(self):
+        if getattr(self, '_admin_active', False): self.attendance_table.reload()
 
     def _edit_attendance_dialog(self):
         d = tk.Toplevel(self)
@@ -591,15 +704,14 @@ class App(tk.Tk):
             tree.column(c, width=col_widths.get(c, 100), anchor="center")
         
         vsb = ttk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
-        tree.configure(yscrollcommand=vsb.set)
         tree.grid(row=0, column=0, sticky='nsew')
         vsb.grid(row=0, column=1, sticky='ns')
         table_frame.grid_rowconfigure(0, weight=1)
         table_frame.grid_columnconfigure(0, weight=1)
         
         # Load data
-        for row in list_attendance(500):
-            tree.insert("", "end", values=(*row, "Present"))
+        table = PagedTreeview(tree, vsb, db.list_attendance_page, values=lambda row: (*row[:5], row[6], "Present"))
+        table.reload()
         
         # Buttons
         btn_frame = ttk.Frame(card, style='Card.TFrame')
@@ -616,10 +728,11 @@ class App(tk.Tk):
             student_name = item['values'][2]
             
             if messagebox.askyesno("Confirm", f"Mark {student_name} as ABSENT and remove this record?"):
-                update_attendance_status(att_id, 'absent')
-                tree.delete(selected[0])
+                db.update_attendance_status(att_id, 'absent')
+                self._export_csvs(full=True)
+                table.remove(att_id)
+                if getattr(self, '_admin_active', False): self.attendance_table.remove(att_id)
                 messagebox.showinfo("Updated", "Attendance marked as absent (record removed).")
-                self._refresh_attendance()
         
         def add_attendance():
             self._manual_add_attendance_dialog(d)
@@ -640,13 +753,13 @@ class App(tk.Tk):
         
         ttk.Label(card, text="Student ID", style='Card.TLabel').grid(row=1, column=0, columnspan=2, sticky="w", pady=(0, 6))
         student_var = tk.StringVar()
-        students = list_students()
+        students = db.list_students()
         student_combo = ttk.Combobox(card, textvariable=student_var, values=[f"{s[0]} - {s[1]}" for s in students], width=32, font=('Segoe UI', 10))
         student_combo.grid(row=2, column=0, columnspan=2, pady=(0, 12), ipady=6)
         
         ttk.Label(card, text="Subject", style='Card.TLabel').grid(row=3, column=0, columnspan=2, sticky="w", pady=(0, 6))
         subject_var = tk.StringVar()
-        subjects = list_subjects()
+        subjects = db.list_subjects()
         subject_combo = ttk.Combobox(card, textvariable=subject_var, values=[f"{s[0]} - {s[1]}" for s in subjects], width=32, font=('Segoe UI', 10))
         subject_combo.grid(row=4, column=0, columnspan=2, pady=(0, 12), ipady=6)
         
@@ -669,8 +782,9 @@ class App(tk.Tk):
                 subject_id = subject_text.split(" - ")[0]
                 attendance_date = datetime.strptime(date_text, "%Y-%m-%d").date()
                 
-                success, msg = add_manual_attendance(person_id, subject_id, attendance_date)
+                success, msg = db.add_manual_attendance(person_id, subject_id, attendance_date)
                 if success:
+                    self._export_csvs()
                     messagebox.showinfo("Success", msg)
                     d.destroy()
                     self._refresh_attendance()
@@ -717,7 +831,7 @@ class App(tk.Tk):
         table_frame.grid_columnconfigure(0, weight=1)
         
         # Load statistics
-        stats = get_detailed_attendance_stats()
+        stats = db.get_detailed_attendance_stats()
         for row in stats:
             person_id, name, subject_id, subject_name, present, total = row
             total = max(total, 1)  # Avoid division by zero
@@ -728,7 +842,7 @@ class App(tk.Tk):
     def _import_excel_dialog(self):
         d = tk.Toplevel(self)
         d.title("Import from Excel")
-        d.geometry("600x500")
+        d.geometry("600x580")
         d.configure(bg=ModernStyle.BACKGROUND)
         
         card = ttk.Frame(d, style='Card.TFrame', padding=30)
@@ -736,7 +850,7 @@ class App(tk.Tk):
         
         ttk.Label(card, text="Import Attendance from Excel", font=('Segoe UI', 14, 'bold'), background=ModernStyle.SURFACE).pack(anchor='w', pady=(0, 16))
         
-        info_text = """Excel file format requirements:
+        info_text = """Excel (.xlsx) or CSV file format requirements:
         
 Column A: Student ID (person_id)
 Column B: Subject ID (subject_id)
@@ -757,7 +871,7 @@ Note: First row can be headers (will be skipped if not valid data)"""
         def browse_file():
             filename = filedialog.askopenfilename(
                 title="Select Excel File",
-                filetypes=[("Excel files", "*.xlsx *.xls"), ("All files", "*.*")]
+                filetypes=[("Excel or CSV files", "*.xlsx *.csv"), ("All files", "*.*")]
             )
             if filename:
                 file_path_var.set(filename)
@@ -773,74 +887,73 @@ Note: First row can be headers (will be skipped if not valid data)"""
         result_text = tk.Text(card, height=8, font=('Segoe UI', 9), relief='solid', borderwidth=1, state='disabled')
         result_text.pack(fill='both', expand=True, pady=(0, 16))
         
+        progress = ttk.Progressbar(card, mode='determinate', maximum=100)
+        progress.pack(fill='x', pady=(0, 6))
+        progress_label = ttk.Label(card, text="", style='Card.TLabel')
+        progress_label.pack(anchor='w', pady=(0, 10))
+        job = None
+
+        def show_result(text):
+            result_text.config(state='normal')
+            result_text.delete('1.0', 'end')
+            result_text.insert('1.0', text)
+            result_text.config(state='disabled')
+
+        def poll():
+            if not d.winfo_exists(): return
+            if job.total:
+                progress.config(mode='determinate')
+                progress['value'] = min(100.0, 100.0 * job.rows_read / job.total)
+            else:
+                progress.config(mode='indeterminate'); progress.step(5)
+            progress_label.config(text=f"{job.rows_read}/{job.total or '?'} rows read · {job.success} imported · "
+                                       f"{job.duplicates} duplicates · {job.n_errors} errors")
+            if not job.done:
+                d.after(100, poll)
+                return
+            import_btn.config(state='normal'); cancel_btn.config(state='disabled')
+            if not job.cancelled and not job.error: progress['value'] = 100
+            show_result("Import Results:\n\n" + job.report())
+            self._refresh_attendance()
+            if job.success: self._export_csvs()
+            if job.error:
+                messagebox.showerror("Import Error", f"Failed to import file:\n{job.error}", parent=d)
+            elif job.cancelled:
+                messagebox.showinfo("Import Cancelled", f"Imported {job.success} records before cancelling.", parent=d)
+            elif not job.success and not job.duplicates:
+                messagebox.showerror("No Data", "No valid attendance records found in the file", parent=d)
+            else:
+                messagebox.showinfo("Import Complete", f"Imported {job.success} records successfully!", parent=d)
+
         def import_file():
+            nonlocal job
             file_path = file_path_var.get()
             if not file_path:
                 messagebox.showwarning("No File", "Please select an Excel file first")
                 return
-            
-            try:
-                import openpyxl
-                from datetime import datetime
-                
-                wb = openpyxl.load_workbook(file_path)
-                sheet = wb.active
-                
-                records = []
-                skipped = 0
-                
-                for row_idx, row in enumerate(sheet.iter_rows(min_row=1, values_only=True), 1):
-                    if len(row) < 3 or not all(row[:3]):
-                        skipped += 1
-                        continue
-                    
-                    try:
-                        person_id = str(row[0]).strip()
-                        subject_id = str(row[1]).strip()
-                        
-                        # Parse date
-                        if isinstance(row[2], datetime):
-                            att_date = row[2].date()
-                        else:
-                            att_date = datetime.strptime(str(row[2]).strip(), "%Y-%m-%d").date()
-                        
-                        records.append((person_id, subject_id, att_date))
-                    except Exception as e:
-                        skipped += 1
-                        continue
-                
-                if not records:
-                    messagebox.showerror("No Data", "No valid attendance records found in the file")
-                    return
-                
-                # Import records
-                success, duplicates, errors = bulk_import_attendance(records)
-                
-                # Display results
-                result_text.config(state='normal')
-                result_text.delete('1.0', 'end')
-                result_text.insert('1.0', f"Import Results:\n\n")
-                result_text.insert('end', f"✓ Successfully imported: {success} records\n")
-                result_text.insert('end', f"⚠ Duplicates skipped: {duplicates} records\n")
-                result_text.insert('end', f"⚠ Invalid rows skipped: {skipped} rows\n")
-                if errors:
-                    result_text.insert('end', f"\nErrors:\n")
-                    for err in errors[:10]:  # Show first 10 errors
-                        result_text.insert('end', f"  • {err}\n")
-                result_text.config(state='disabled')
-                
-                self._refresh_attendance()
-                messagebox.showinfo("Import Complete", f"Imported {success} records successfully!")
-                
-            except ImportError:
-                messagebox.showerror("Missing Library", "Please install openpyxl: pip install openpyxl")
-            except Exception as e:
-                messagebox.showerror("Import Error", f"Failed to import file:\n{str(e)}")
-        
+            if Path(file_path).suffix.lower() not in ('.xlsx', '.xlsm', '.csv'):
+                messagebox.showerror("Import Error", "Please select an .xlsx or .csv file")
+                return
+            show_result("")
+            progress['value'] = 0
+            import_btn.config(state='disabled'); cancel_btn.config(state='normal')
+            # Reads and inserts in chunks on a worker thread; poll() keeps the dialog updated
+            from .importer import ImportJob
+            job = ImportJob(file_path).start()
+            d.after(100, poll)
+
+        def close():
+            if job and not job.done: job.cancel()
+            d.destroy()
+
         btn_frame = ttk.Frame(card, style='Card.TFrame')
         btn_frame.pack(fill='x')
-        ttk.Button(btn_frame, text="Close", command=d.destroy, style='Secondary.TButton').pack(side='left', padx=(0, 8))
-        ttk.Button(btn_frame, text="Import", command=import_file, style='Primary.TButton').pack(side='left')
+        ttk.Button(btn_frame, text="Close", command=close, style='Secondary.TButton').pack(side='left', padx=(0, 8))
+        import_btn = ttk.Button(btn_frame, text="Import", command=import_file, style='Primary.TButton')
+        import_btn.pack(side='left', padx=(0, 8))
+        cancel_btn = ttk.Button(btn_frame, text="Cancel", command=lambda: job and job.cancel(), style='Secondary.TButton', state='disabled')
+        cancel_btn.pack(side='left')
+        d.protocol("WM_DELETE_WINDOW", close)
 
 if __name__ == "__main__":
     App().mainloop()
@@ -0,0 +1,208 @@
+from __future__ import annotations
+import os, threading, cv2, numpy as np
+from pathlib import Path
+from typing import List, Sequence, Tuple
+
+# LBPH's "no match" answer: label -1 at DBL_MAX distance
+NO_MATCH = (-1, float(np.finfo(np.float64).max))
+# Bump when the binary layout changes; older files are refused and need converting again
+MODEL_FORMAT_VERSION = 1
+# Samples whose exact distance is computed in one numpy pass, nearest bound first
+EXACT_CHUNK = 256
+# Up to this many candidates in a chunk, a face's samples are scored one by one with compareHist
+FEW_CANDIDATES = 16
+
+def matrix_paths(path: Path):
+    """The two .npy files that go with a binary model header ``path`` (``x.npz``)."""
+    path = Path(path)
+    return path.with_suffix(".hist.npy"), path.with_suffix(".sqrt.npy")
+
+def _harmonic(rows: np.ndarray, bins: np.ndarray, inv_q: np.ndarray, inverted: bool) -> np.ndarray:
+    """sum(h*q/(h+q)) over ``bins`` for each row h of ``rows`` (holding 1/h if ``inverted``), as
+    sum(1/(1/h + 1/q)): in float32, and an empty bin's 1/0 = inf adds 0 as it should."""
+    h = np.take(rows, bins, axis=1)
+    with np.errstate(divide="ignore"):
+        if not inverted: np.reciprocal(h, out=h)
+        h += inv_q
+        np.reciprocal(h, out=h)
+    return h @ np.ones(len(bins), np.float32)
+
+class BatchLBPHMatcher:
+    """Nearest-neighbour LBPH matching against one contiguous float32 histogram matrix.
+
+    Returns exactly what ``LBPHFaceRecognizer.predict`` returns (chi-square ALT distance,
+    first minimum wins, ``threshold`` respected) for all faces of a frame at once.
+
+    Since a*q/(a+q) <= sqrt(a*q)/2, the chi-square ALT distance is bounded below by
+    2*sum((sqrt a - sqrt q)^2). That bound is one matrix product for every (face, sample)
+    pair. Exact distances are then computed with numpy, ``EXACT_CHUNK`` samples at a time in
+    order of their bound, each chunk read once for all faces of the frame, until no face's
+    remaining bounds can beat its best match. numpy's float32 result is close but not bit-exact,
+    so the few samples within its error of the best are re-scored with ``cv2.compareHist``.
+    """
+
+    def __init__(self, histograms: np.ndarray, labels: np.ndarray, radius: int = 1, neighbors: int = 8,
+                 grid_x: int = 8, grid_y: int = 8, threshold: float = NO_MATCH[1], sqrt_t=None, row_sums=None):
+        self.histograms = np.ascontiguousarray(histograms, dtype=np.float32)
+        self.labels = np.asarray(labels, dtype=np.int32).ravel()
+        if self.histograms.ndim != 2 or len(self.histograms) != len(self.labels):
+            raise ValueError("histograms must be (n_samples, n_bins) with one label per row")
+        self.radius, self.neighbors, self.grid_x, self.grid_y = radius, neighbors, grid_x, grid_y
+        self.threshold = threshold
+        # Bin-major so the bins a frame actually uses are read as contiguous rows. A binary
+        # model passes both in precomputed, so loading it does not touch the matrix at all
+        self._sqrt_t = np.ascontiguousarray(np.sqrt(self.histograms).T) if sqrt_t is None else sqrt_t
+        self._row_sums = self.histograms.sum(axis=1, dtype=np.float64) if row_sums is None else row_sums
+        self._local = threading.local()
+
+    @classmethod
+    def from_recognizer(cls, recognizer, **kw) -> "BatchLBPHMatcher":
+        hists = recognizer.getHistograms()
+        n_bins = (2 ** recognizer.getNeighbors()) * recognizer.getGridX() * recognizer.getGridY()
+        matrix = np.vstack([h.reshape(1, -1) for h in hists]) if hists else np.empty((0, n_bins), np.float32)
+        kw.setdefault("threshold", recognizer.getThreshold())
+        return cls(matrix, recognizer.getLabels(), recognizer.getRadius(), recognizer.getNeighbors(),
+                   recognizer.getGridX(), recognizer.getGridY(), **kw)
+
+    @classmethod
+    def load(cls, model_path: Path, **kw) -> "BatchLBPHMatcher":
+        """Load a binary model (.npz, see ``save``) or an OpenCV LBPH YAML file."""
+        if Path(model_path).suffix == ".npz":
+            return cls.load_binary(model_path, **kw)
+        recognizer = cv2.face.LBPHFaceRecognizer_create()
+        recognizer.read(str(model_path))
+        return cls.from_recognizer(recognizer, **kw)
+
+    def save(self, path: Path) -> None:
+        """Write the binary model: ``path`` (.npz) holds the version, LBP parameters, labels and
+        row sums; the histogram matrix and its bin-major square root go to two .npy files
+        beside it. The header is written last, so a crash never leaves a loadable half model."""
+        path = Path(path)
+        for target, matrix in zip(matrix_paths(path), (self.histograms, self._sqrt_t)):
+            tmp = target.with_name(target.name + ".tmp")
+            with open(tmp, "wb") as f: np.save(f, np.ascontiguousarray(matrix, dtype=np.float32))
+            os.replace(tmp, target)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, version=np.int32(MODEL_FORMAT_VERSION),
+                     params=np.array([self.radius, self.neighbors, self.grid_x, self.grid_y], np.int32),
+                     threshold=np.float64(self.threshold), labels=self.labels, row_sums=self._row_sums)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load_binary(cls, path: Path, **kw) -> "BatchLBPHMatcher":
+        """Open a model written by ``save``. Both matrices are memory-mapped read-only: loading
+        is near-instant whatever the model size, and pages are read as matching needs them."""
+        with np.load(path) as header:
+            version = int(header["version"])
+            if version != MODEL_FORMAT_VERSION:
+                raise RuntimeError(f"{path} is model format v{version}, this version reads v{MODEL_FORMAT_VERSION}; "
+                                   "convert the YAML model again")
+            radius, neighbors, grid_x, grid_y = (int(v) for v in header["params"])
+            threshold, labels, row_sums = float(header["threshold"]), header["labels"], header["row_sums"]
+        hist_path, sqrt_path = matrix_paths(path)
+        histograms, sqrt_t = np.load(hist_path, mmap_mode="r"), np.load(sqrt_path, mmap_mode="r")
+        n_bins = (2 ** neighbors) * grid_x * grid_y
+        if histograms.shape != (len(labels), n_bins) or sqrt_t.shape != (n_bins, len(labels)):
+            raise RuntimeError(f"{path}: matrix files do not match the header (partially written model?)")
+        kw.setdefault("threshold", threshold)
+        return cls(histograms, labels, radius, neighbors, grid_x, grid_y, sqrt_t=sqrt_t, row_sums=row_sums, **kw)
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def histogram(self, face: np.ndarray) -> np.ndarray:
+        """Spatial LBP histogram of a gray face, computed by OpenCV's own LBPH code."""
+        scratch = getattr(self._local, "recognizer", None)
+        if scratch is None:
+            scratch = cv2.face.LBPHFaceRecognizer_create(radius=self.radius, neighbors=self.neighbors,
+                                                         grid_x=self.grid_x, grid_y=self.grid_y)
+            self._local.recognizer = scratch
+        scratch.train([face], np.array([0], dtype=np.int32))
+        return scratch.getHistograms()[0].ravel()
+
+    def lower_bounds(self, queries: np.ndarray) -> np.ndarray:
+        """Lower bound on the distance of every (query, sample) pair, shape (n_queries, n_samples)."""
+        q_sums = queries.sum(axis=1, dtype=np.float64)
+        bins = np.flatnonzero(queries.any(axis=0))
+        dots = (np.sqrt(queries[:, bins]) @ self._sqrt_t[bins]).astype(np.float64)
+        return 2.0 * (self._row_sums[None, :] + q_sums[:, None]) - 4.0 * dots
+
+    def _nearest(self, queries: np.ndarray, bounds: np.ndarray) -> List[Tuple[int, float]]:
+        n_q, n = bounds.shape
+        scale = float(self._row_sums.max()) + queries.sum(axis=1, dtype=np.float64)
+        # float32 matmul rounding: never prune a sample whose bound is this close to the best
+        lbs = bounds - 1e-3 * scale[:, None]
+        # Error of the float32 distances: samples this close to the best are re-scored exactly
+        tie = 1e-4 * scale
+        # One order for all faces (nearest to any face first), so each chunk is read once per frame
+        order = np.argsort(lbs.min(axis=0), kind="stable")
+        lbs = lbs[:, order]
+        rest = np.minimum.accumulate(lbs[:, ::-1], axis=1)[:, ::-1]  # lowest bound still to come
+        density = np.count_nonzero(queries) / queries.size
+        bins, q_sums, inv_q = [None] * n_q, [0.0] * n_q, [None] * n_q
+        # Seeded with each face's lowest-bound sample, so the first chunk is pruned as well
+        pos = np.argmin(lbs, axis=1)
+        first = order[pos]
+        best = np.array([self._compare(q, [i])[0] for q, i in zip(queries, first)])
+        lbs[np.arange(n_q), pos] = np.inf  # scored already
+        # Per face: (samples, distances, exact?) - exact when they came from compareHist
+        found = [[(np.array([i]), np.array([d]), True)] for i, d in zip(first, best)]
+        for start in range(0, n, EXACT_CHUNK):
+            cut = np.minimum(best + tie, self.threshold)
+            live = rest[:, start] <= cut
+            if not live.any(): break
+            chunk = lbs[:, start:start + EXACT_CHUNK]
+            wanted = live[:, None] & (chunk <= (best + tie)[:, None]) & (chunk < self.threshold)
+            idx = order[start:start + EXACT_CHUNK]
+            # A handful of candidates is cheaper to score one by one than to set up a numpy pass for
+            few = wanted.sum(axis=1) <= FEW_CANDIDATES
+            for qi in np.flatnonzero(few & wanted.any(axis=1)):
+                d = self._compare(queries[qi], idx[wanted[qi]])
+                found[qi].append((idx[wanted[qi]], d, True)); best[qi] = min(best[qi], d.min())
+            wanted[few] = False
+            rows = wanted.any(axis=0)
+            idx, wanted = idx[rows], wanted[:, rows]
+            # Inverting the whole chunk once pays off when enough faces read the same rows
+            shared = wanted.sum() * density > len(idx)
+            if shared:
+                with np.errstate(divide="ignore"): block = np.reciprocal(self.histograms[idx])
+            for qi in np.flatnonzero(wanted.any(axis=1)):
+                sel = wanted[qi]
+                if bins[qi] is None:
+                    q = queries[qi]
+                    bins[qi] = nz = np.flatnonzero(q)
+                    q_sums[qi], inv_q[qi] = float(q[nz].sum(dtype=np.float64)), np.reciprocal(q[nz])
+                if not shared: part = self.histograms[idx[sel]]
+                else: part = block if sel.all() else block[sel]
+                # (h-q)^2/(h+q) = h + q - 4hq/(h+q): with the row sums known, only q's non-zero bins are read
+                d = 2.0 * (self._row_sums[idx[sel]] + q_sums[qi] - 4.0 * _harmonic(part, bins[qi], inv_q[qi], shared))
+                found[qi].append((idx[sel], d, False)); best[qi] = min(best[qi], d.min())
+        return [self._exact(q, parts, b + t) for q, parts, b, t in zip(queries, found, best, tie)]
+
+    def _compare(self, q: np.ndarray, idx) -> np.ndarray:
+        """Distances from ``q`` to the samples ``idx``, scored by ``cv2.compareHist`` as ``predict`` does."""
+        return np.array([cv2.compareHist(q, self.histograms[i], cv2.HISTCMP_CHISQR_ALT) for i in idx])
+
+    def _exact(self, q: np.ndarray, found, cut: float) -> Tuple[int, float]:
+        """The best of the samples within ``cut``, numpy's distances re-scored by ``compareHist``;
+        ties go to the lower index."""
+        best_idx, best_d = -1, NO_MATCH[1]
+        for idx, d, exact in found:
+            keep = d <= cut
+            idx = idx[keep]
+            for i, exact in zip(idx, d[keep] if exact else self._compare(q, idx)):
+                if exact < best_d or (exact == best_d and i < best_idx):
+                    best_idx, best_d = int(i), exact
+        if best_idx < 0 or best_d >= self.threshold:
+            return NO_MATCH
+        return int(self.labels[best_idx]), best_d
+
+    def predict_batch(self, faces: Sequence[np.ndarray]) -> List[Tuple[int, float]]:
+        if not len(faces): return []
+        if not len(self.labels): return [NO_MATCH] * len(faces)
+        queries = np.vstack([self.histogram(f) for f in faces])
+        return self._nearest(queries, self.lower_bounds(queries))
+
+    def predict(self, face: np.ndarray) -> Tuple[int, float]:
+        return self.predict_batch([face])[0]
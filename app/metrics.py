@@ -0,0 +1,156 @@
+"""Stage timers and counters for the attendance loop, with rolling percentiles.
+
+Disabled by default: ``timer`` then hands back one shared no-op context manager and
+``count``/``observe`` return after a single flag check, so instrumented code costs a
+function call per stage. ``enable()`` (or ATTENDANCE_METRICS=1) turns recording on.
+
+    with metrics.timer("detect"):
+        faces = detector.detect(gray)
+"""
+import json, os, threading, time
+from collections import deque
+from contextlib import nullcontext
+from functools import wraps
+from .config import METRICS_ENABLED, METRICS_WINDOW
+
+# numpy and cv2 are imported where used: the database layer imports this module too
+_enabled = METRICS_ENABLED
+_lock = threading.Lock()
+_samples = {}   # stage -> deque of the last METRICS_WINDOW durations (seconds)
+_totals = {}    # stage -> [count, sum of seconds]
+_counters = {}
+_NOOP = nullcontext()
+
+def enable(on: bool = True) -> None:
+    global _enabled
+    _enabled = on
+
+def enabled() -> bool:
+    return _enabled
+
+def reset() -> None:
+    with _lock:
+        _samples.clear(); _totals.clear(); _counters.clear()
+
+def observe(name: str, seconds: float) -> None:
+    if not _enabled: return
+    with _lock:
+        window = _samples.get(name)
+        if window is None:
+            window = _samples[name] = deque(maxlen=METRICS_WINDOW)
+            _totals[name] = [0, 0.0]
+        window.append(seconds)
+        total = _totals[name]
+        total[0] += 1; total[1] += seconds
+
+def count(name: str, n: int = 1) -> None:
+    if not _enabled: return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+class _Timer:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.t0)
+        return False
+
+def timer(name: str):
+    """Context manager recording how long its block takes under ``name``."""
+    return _Timer(name) if _enabled else _NOOP
+
+def timed(fn=None, *, name: str = None):
+    """Decorator form of ``timer``; the default name is ``module.function``."""
+    def wrap(f):
+        label = name or f"{f.__module__.rsplit('.', 1)[-1]}.{f.__name__}"
+        @wraps(f)
+        def inner(*args, **kw):
+            if not _enabled: return f(*args, **kw)
+            t0 = time.perf_counter()
+            try:
+                return f(*args, **kw)
+            finally:
+                observe(label, time.perf_counter() - t0)
+        return inner
+    return wrap(fn) if fn else wrap
+
+def snapshot() -> dict:
+    """{"stages": {name: {count, mean_ms, p50_ms, p95_ms, p99_ms}}, "counters": {...}}; percentiles
+    cover the last METRICS_WINDOW samples, count and mean the whole run."""
+    import numpy as np
+    with _lock:
+        windows = {name: np.fromiter(w, float, len(w)) for name, w in _samples.items()}
+        totals = {name: tuple(t) for name, t in _totals.items()}
+        counters = dict(_counters)
+    stages = {}
+    for name, w in sorted(windows.items()):
+        n, total = totals[name]
+        p50, p95, p99 = np.percentile(w, [50, 95, 99]) * 1000 if len(w) else (0.0, 0.0, 0.0)
+        stages[name] = {"count": n, "mean_ms": round(total / n * 1000, 3) if n else 0.0,
+                        "p50_ms": round(float(p50), 3), "p95_ms": round(float(p95), 3), "p99_ms": round(float(p99), 3)}
+    return {"stages": stages, "counters": counters}
+
+def to_prometheus(snap: dict) -> str:
+    lines = ["# TYPE attendance_stage_seconds summary"]
+    for name, s in snap["stages"].items():
+        for q, key in (("0.5", "p50_ms"), ("0.95", "p95_ms"), ("0.99", "p99_ms")):
+            lines.append(f'attendance_stage_seconds{{stage="{name}",quantile="{q}"}} {s[key] / 1000:.6f}')
+        lines.append(f'attendance_stage_seconds_count{{stage="{name}"}} {s["count"]}')
+        lines.append(f'attendance_stage_seconds_sum{{stage="{name}"}} {s["mean_ms"] * s["count"] / 1000:.6f}')
+    lines.append("# TYPE attendance_events_total counter")
+    for name, n in sorted(snap["counters"].items()):
+        lines.append(f'attendance_events_total{{event="{name}"}} {n}')
+    return "\n".join(lines) + "\n"
+
+def dump(path) -> None:
+    """Write the current snapshot: Prometheus text (replaced atomically) unless ``path`` ends in
+    .jsonl/.json, which get one appended JSON line per dump."""
+    path = str(path)
+    snap = snapshot()
+    if path.endswith((".jsonl", ".json")):
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"ts": time.time(), **snap}) + "\n")
+    else:
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(to_prometheus(snap))
+        os.replace(tmp, path)  # a node_exporter textfile collector never sees a half-written file
+
+class Dumper:
+    """Dumps metrics to ``path`` every ``every`` seconds on a daemon thread, and once more on close."""
+
+    def __init__(self, path, every: float = 10.0):
+        self.path, self.every = path, every
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-dump", daemon=True)
+
+    def start(self) -> "Dumper":
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.every):
+            dump(self.path)
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=2)
+        dump(self.path)
+
+def draw_overlay(frame, stages=("capture", "detect", "recognize", "display")) -> None:
+    """FPS (from the "frame" timer) and p50/p95 of ``stages`` in the top-left corner of ``frame``."""
+    if not _enabled: return
+    import cv2
+    snap = snapshot()["stages"]
+    frame_ms = snap.get("frame", {}).get("p50_ms", 0.0)
+    lines = [f"FPS {1000 / frame_ms:.1f}" if frame_ms else "FPS -"]
+    lines += [f"{name} {snap[name]['p50_ms']:.1f}/{snap[name]['p95_ms']:.1f} ms" for name in stages if name in snap]
+    for i, text in enumerate(lines):
+        cv2.putText(frame, text, (10, 22 + 20 * i), cv2.FONT_HERSHEY_SIMPLEX, 0.55, (0, 255, 255), 1, cv2.LINE_AA)
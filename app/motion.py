@@ -0,0 +1,98 @@
+import time, cv2, numpy as np
+from .config import DETECT_MIN_FACE, MOTION_THRESHOLD, MOTION_MIN_CHANGED, MOTION_FORCE_EVERY
+
+class MotionGate:
+    """Skips face detection while the scene is static.
+
+    Each frame is shrunk to ``width`` pixels, blurred and compared with the frame detection
+    last ran on. Below ``min_changed`` (fraction of pixels differing by more than
+    ``threshold`` grey levels) detection is skipped and callers keep their previous results.
+    Small changes only re-detect around the changed blobs (padded by a face size); faces found
+    earlier elsewhere are carried over. A full detection runs at least every ``force_every``
+    seconds so slow drift and faces that sat still through a change are caught.
+    """
+
+    def __init__(self, force_every: float = MOTION_FORCE_EVERY, threshold: int = MOTION_THRESHOLD,
+                 min_changed: float = MOTION_MIN_CHANGED, width: int = 160, pad: int = DETECT_MIN_FACE,
+                 max_local: float = 0.5, clock=time.monotonic):
+        self.force_every, self.threshold, self.min_changed = force_every, threshold, min_changed
+        self.width, self.pad, self.max_local, self.clock = width, pad, max_local, clock
+        self.frames = self.skipped = self.local = 0
+        self._reference = None
+        self._last_full = None
+        self._boxes = np.zeros((0, 4), np.int32)
+
+    def _thumb(self, gray):
+        h, w = gray.shape[:2]
+        small = cv2.resize(gray, (self.width, max(1, round(h * self.width / w))), interpolation=cv2.INTER_AREA)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def changed_regions(self, thumb, shape):
+        """None if nothing changed, [] if a full detection is needed, else regions in frame pixels."""
+        mask = (cv2.absdiff(thumb, self._reference) > self.threshold).astype(np.uint8)
+        if mask.mean() < self.min_changed:
+            return None
+        mask = cv2.dilate(mask, np.ones((3, 3), np.uint8))
+        _, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+        fh, fw = shape[:2]
+        k = fw / float(self.width)
+        regions = [(int(x * k) - self.pad, int(y * k) - self.pad, int(w * k) + 2 * self.pad, int(h * k) + 2 * self.pad)
+                   for x, y, w, h, _ in stats[1:]]
+        # A face that moved a little only changes in patches: take in whole earlier boxes (with
+        # a margin for the move) and merge overlapping regions so the cascade sees the full face
+        margins = [(x - w // 4, y - h // 4, w + w // 2, h + h // 2) for (x, y, w, h) in self._boxes]
+        regions = _merge(regions + [m for m in margins if any(_overlaps(m, r) for r in regions)])
+        regions = [(max(0, x), max(0, y), min(fw, x + w) - max(0, x), min(fh, y + h) - max(0, y)) for (x, y, w, h) in regions]
+        area = sum(w * h for (_, _, w, h) in regions)
+        return [] if area > self.max_local * fw * fh else regions
+
+    def detect(self, gray, detector):
+        """Face boxes for ``gray``, or None when detection was skipped (reuse the last results)."""
+        self.frames += 1
+        now, thumb = self.clock(), self._thumb(gray)
+        if self._reference is None or now - self._last_full >= self.force_every:
+            regions = []
+        else:
+            regions = self.changed_regions(thumb, gray.shape)
+        if regions is None:
+            self.skipped += 1
+            return None
+        if regions:
+            self.local += 1
+            # Faces outside every changed region are where they were
+            kept = [b for b in self._boxes if not any(_overlaps(b, r) for r in regions)]
+            found = detector.detect(gray, rois=regions)
+            boxes = np.array(kept + list(found), np.int32).reshape(-1, 4)
+        else:
+            self._last_full = now
+            boxes = detector.detect(gray)
+        self._reference, self._boxes = thumb, boxes
+        return boxes
+
+    @property
+    def skipped_fraction(self) -> float:
+        return self.skipped / self.frames if self.frames else 0.0
+
+    def summary(self) -> str:
+        return (f"[STATS] motion gate: {self.skipped}/{self.frames} frames skipped ({self.skipped_fraction:.0%}), "
+                f"{self.local} detected in changed regions only")
+
+def _overlaps(a, b) -> bool:
+    return a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
+
+def _merge(rects):
+    """Replace overlapping rectangles by their bounding box until none overlap."""
+    rects = list(rects)
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(rects)):
+            for j in range(i + 1, len(rects)):
+                if _overlaps(rects[i], rects[j]):
+                    (ax, ay, aw, ah), (bx, by, bw, bh) = rects[i], rects[j]
+                    x, y = min(ax, bx), min(ay, by)
+                    rects[i] = (x, y, max(ax + aw, bx + bw) - x, max(ay + ah, by + bh) - y)
+                    del rects[j]; merged = True
+                    break
+            if merged: break
+    return rects
@@ -0,0 +1,202 @@
+import argparse, queue, threading, time, cv2
+from pathlib import Path
+from .attendance_db import init_db
+from .attendance_writer import AttendanceWriter
+from .auto_export import ExportService
+from .pipeline import DropOldestQueue
+from .config import MOTION_GATE
+from .detection import FaceDetector
+from .motion import MotionGate
+from .recognize_and_mark import load_model, annotate
+
+def parse_stream(spec: str):
+    """'SOURCE:SUBJECT_ID' -> (source, subject_id); a numeric source is a camera index."""
+    source, sep, subject_id = spec.rpartition(":")
+    if not sep or not source or not subject_id:
+        raise argparse.ArgumentTypeError(f"expected SOURCE:SUBJECT_ID, got {spec!r}")
+    return (int(source) if source.isdigit() else source), subject_id
+
+class Stream:
+    """One source captured and face-detected on its own thread.
+
+    Cameras hand over only their newest frame; video files are read as fast as the
+    recognizer keeps up (or at their own frame rate with ``realtime``) and end at EOF.
+    """
+
+    def __init__(self, index: int, source, subject_id: str, realtime: bool = False, motion_gate: bool = MOTION_GATE):
+        self.index, self.source, self.subject_id = index, source, subject_id
+        self.name = f"{index}:{Path(str(source)).name}->{subject_id}"
+        self.is_file = not isinstance(source, int)
+        self.cap = cv2.VideoCapture(source)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Cannot open source {source!r}")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.realtime = realtime
+        self.detector = FaceDetector()  # not shared: one per thread
+        self.gate = MotionGate() if motion_gate else None
+        self.pending = queue.Queue(maxsize=2) if self.is_file else DropOldestQueue(1)
+        self.status = {}               # person_id -> created, as in the single-camera runner
+        self.frames_read = self.frames_done = 0
+        self.t0 = self.t_end = None
+        self.finished = threading.Event()
+        self.latest = (None, [])
+        self.lock = threading.Lock()
+        self._thread = threading.Thread(target=self._capture, name=f"capture-{index}", daemon=True)
+
+    @property
+    def dropped(self) -> int:
+        return getattr(self.pending, "dropped", 0)
+
+    def start(self, stop: threading.Event) -> None:
+        self._stop = stop
+        self.t0 = time.perf_counter()
+        self._thread.start()
+
+    def _capture(self):
+        next_due = time.perf_counter()
+        while not self._stop.is_set():
+            ok, frame = self.cap.read()
+            if not ok:
+                if self.is_file: break
+                time.sleep(0.005); continue
+            self.frames_read += 1
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            # None (static scene) tells the recognizer to reuse this stream's last results
+            faces = self.gate.detect(gray, self.detector) if self.gate else self.detector.detect(gray)
+            item = (frame, gray, faces)
+            if self.is_file:
+                while not self._stop.is_set():
+                    try: self.pending.put(item, timeout=0.1); break
+                    except queue.Full: continue
+                if self.realtime:
+                    next_due += 1.0 / self.fps
+                    time.sleep(max(0.0, next_due - time.perf_counter()))
+            else:
+                self.pending.put(item)
+        self.t_end = time.perf_counter()
+        self.finished.set()
+
+    def done(self) -> bool:
+        if self.is_file: return self.finished.is_set() and self.pending.empty()
+        return self.finished.is_set()
+
+    def join(self) -> None:
+        self._thread.join(timeout=2)
+        self.cap.release()
+
+class MultiStreamRecognizer:
+    """Recognizes the faces of every stream with one matcher, batching across streams,
+    and marks attendance through one shared ``mark`` (the write-behind writer)."""
+
+    def __init__(self, streams, matcher, label_map, threshold: float, mark):
+        self.streams, self.matcher, self.label_map = streams, matcher, label_map
+        self.threshold, self.mark = threshold, mark
+        self.batches = self.faces = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="recognize", daemon=True)
+
+    def start(self) -> "MultiStreamRecognizer":
+        for s in self.streams: s.start(self._stop)
+        self._thread.start()
+        return self
+
+    def _take(self):
+        batch = []
+        for s in self.streams:
+            try: batch.append((s, *s.pending.get(timeout=0)))
+            except queue.Empty: continue
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._take()
+            if not batch:
+                if all(s.done() for s in self.streams): break
+                time.sleep(0.002); continue
+            owners, crops = [], []
+            for s, _, gray, faces in batch:
+                if faces is None: continue
+                for (x,y,w,h) in faces:
+                    owners.append((s, (x,y,w,h))); crops.append(gray[y:y+h, x:x+w])
+            predictions = self.matcher.predict_batch(crops)
+            self.batches += 1; self.faces += len(crops)
+            results = {s: ([] if faces is not None else s.latest[1]) for s, _, _, faces in batch}
+            for (s, box), (label_id, conf) in zip(owners, predictions):
+                meta = self.label_map.get(str(label_id)) or self.label_map.get(label_id)
+                if meta and conf <= self.threshold:
+                    person_id = meta["person_id"]
+                    if person_id not in s.status:
+                        created, msg = self.mark(person_id, s.subject_id)
+                        s.status[person_id] = created
+                        print(f"[OK] {s.name}: {meta['name']} ({person_id}) {msg}")
+                    results[s].append((box, meta, conf))
+                else:
+                    results[s].append((box, None, conf))
+            for s, frame, _, _ in batch:
+                s.frames_done += 1
+                with s.lock: s.latest = (frame, results[s])
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=2)
+        for s in self.streams: s.join()
+
+    def stats(self):
+        lines = []
+        for s in self.streams:
+            elapsed = max((s.t_end or time.perf_counter()) - s.t0, 1e-9)
+            lines.append(f"[STATS] {s.name}: capture {s.frames_read / elapsed:.1f} fps, "
+                         f"recognized {s.frames_done / elapsed:.1f} fps, dropped {s.dropped}"
+                         + (f", detection skipped on {s.gate.skipped_fraction:.0%} (static)" if s.gate else ""))
+        lines.append(f"[STATS] recognizer: {self.batches} batches, {self.faces / max(self.batches, 1):.2f} faces/batch")
+        return "\n".join(lines)
+
+def main():
+    p = argparse.ArgumentParser(description="Mark attendance from several cameras or video files in one process")
+    p.add_argument("streams", nargs="+", type=parse_stream, metavar="SOURCE:SUBJECT_ID",
+                   help="Camera index or video file, and the subject to mark, e.g. 0:MATH101 lecture.mp4:ENG201")
+    p.add_argument("--threshold", type=float, default=70.0)
+    p.add_argument("--headless", action="store_true", help="No preview windows")
+    p.add_argument("--realtime", action="store_true", help="Play video files at their own frame rate")
+    p.add_argument("--stats-every", type=float, default=5.0, help="Seconds between FPS reports")
+    p.add_argument("--no-motion-gate", dest="motion_gate", action="store_false", default=MOTION_GATE,
+                   help="Detect on every frame, even when the scene has not changed")
+    args = p.parse_args()
+
+    init_db()
+    matcher, label_map = load_model(args.threshold)
+    streams = [Stream(i, source, subject_id, args.realtime, args.motion_gate) for i, (source, subject_id) in enumerate(args.streams)]
+
+    exporter = ExportService().start()
+    writer = AttendanceWriter(on_flush=lambda n: exporter.trigger()).start()
+    runner = MultiStreamRecognizer(streams, matcher, label_map, args.threshold, writer.mark).start()
+    print(f"[INFO] {len(streams)} stream(s) running" + ("" if args.headless else "; Q=quit"))
+    last_report = time.perf_counter()
+    try:
+        while runner.running:
+            if args.headless:
+                time.sleep(0.1)
+            else:
+                for s in streams:
+                    with s.lock: frame, results = s.latest
+                    if frame is None: continue
+                    frame = frame.copy()
+                    annotate(frame, results, s.subject_id, s.status)
+                    cv2.imshow(f"Attendance {s.name}", frame)
+                if (cv2.waitKey(15) & 0xFF) in (ord('q'), ord('Q')): break
+            if time.perf_counter() - last_report >= args.stats_every:
+                print(runner.stats()); last_report = time.perf_counter()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        runner.stop()
+        print(runner.stats())
+        writer.close(); exporter.close()
+        cv2.destroyAllWindows()
+
+if __name__ == "__main__":
+    main()
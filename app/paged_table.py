@@ -0,0 +1,69 @@
+class PagedTreeview:
+    """Treeview over a keyset-paginated source, newest rows on top.
+
+    ``fetch(after_id=None, before_id=None, limit=N)`` returns rows (id first) in descending
+    id order. ``refresh`` only asks for ids above the newest one shown and inserts those at
+    the top; older pages are fetched when the view is scrolled near the bottom. Rows
+    deleted elsewhere disappear on ``reload`` (or ``remove`` for deletes made here).
+    """
+
+    def __init__(self, tree, scrollbar, fetch, values=None, page_size: int = 200):
+        self.tree, self.scrollbar, self.fetch = tree, scrollbar, fetch
+        self.values = values or (lambda row: row)
+        self.page_size = page_size
+        self.newest_id = None
+        self.oldest_id = None
+        self.exhausted = False
+        self._loading = False
+        tree.configure(yscrollcommand=self._on_scroll)
+
+    def _insert(self, rows, index):
+        for row in rows:
+            self.tree.insert("", index, iid=str(row[0]), values=self.values(row))
+            if index != "end": index += 1
+
+    def reload(self) -> None:
+        self.tree.delete(*self.tree.get_children())
+        rows = self.fetch(limit=self.page_size)
+        self._insert(rows, "end")
+        self.newest_id = rows[0][0] if rows else None
+        self.oldest_id = rows[-1][0] if rows else None
+        self.exhausted = len(rows) < self.page_size
+
+    def refresh(self) -> int:
+        """Insert rows newer than the newest shown; returns how many were added."""
+        if self.newest_id is None:
+            self.reload()
+            return len(self.tree.get_children())
+        rows = self.fetch(after_id=self.newest_id, limit=self.page_size + 1)
+        if not rows: return 0
+        if len(rows) > self.page_size:
+            # Too far behind (e.g. a big import): start over from the newest page
+            self.reload()
+            return len(rows)
+        self._insert(rows, 0)
+        self.newest_id = rows[0][0]
+        return len(rows)
+
+    def load_older(self) -> int:
+        if self.exhausted or self.oldest_id is None: return 0
+        rows = self.fetch(before_id=self.oldest_id, limit=self.page_size)
+        self._insert(rows, "end")
+        if rows: self.oldest_id = rows[-1][0]
+        self.exhausted = len(rows) < self.page_size
+        return len(rows)
+
+    def remove(self, row_id) -> None:
+        if self.tree.exists(str(row_id)): self.tree.delete(str(row_id))
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if float(last) > 0.95 and not self.exhausted and not self._loading:
+            self._loading = True
+            self.tree.after_idle(self._load_more)
+
+    def _load_more(self):
+        try:
+            if self.tree.winfo_exists(): self.load_older()
+        finally:
+            self._loading = False
@@ -0,0 +1,132 @@
+from __future__ import annotations
+import queue, threading, time, cv2
+from collections import deque
+from . import metrics
+from .tracker import identify_tracks
+
+class DropOldestQueue:
+    """Bounded queue that never blocks producers: when full, the oldest item is discarded."""
+
+    def __init__(self, maxsize: int = 1):
+        self._items = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self.dropped = 0
+
+    def put(self, item) -> None:
+        with self._cond:
+            if len(self._items) == self._items.maxlen: self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout: float = None):
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items, timeout):
+                raise queue.Empty
+            return self._items.popleft()
+
+class AttendancePipeline:
+    """Live attendance as capture -> detect -> recognize -> persist threads.
+
+    Frame queues drop the oldest frame under load, so capture always runs at camera
+    speed and every stage works on the freshest frame it can get. Marks go through a
+    blocking queue since they must not be lost. ``latest()`` hands the display the
+    newest frame plus the most recent recognition results. With a ``tracker`` each
+    face track is identified once rather than on every frame; with a motion ``gate``
+    static frames are not detected or recognized at all.
+    """
+
+    def __init__(self, cap, detector, matcher, label_map, subject_id, threshold, mark, on_marked=None, tracker=None,
+                 gate=None):
+        self.cap, self.detector, self.matcher, self.label_map = cap, detector, matcher, label_map
+        self.tracker, self.gate = tracker, gate
+        self.subject_id, self.threshold = subject_id, threshold
+        self.mark, self.on_marked = mark, on_marked
+        self.frames = DropOldestQueue(1)
+        self.detections = DropOldestQueue(1)
+        self.marks = queue.Queue(maxsize=256)
+        # person_id -> True if this session created the mark, False if it already existed
+        self.status = {}
+        self._queued = set()
+        self._latest_frame = None
+        self._latest_results = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = [threading.Thread(target=fn, name=fn.__name__, daemon=True)
+                         for fn in (self._capture, self._detect, self._recognize, self._persist)]
+
+    def start(self) -> "AttendancePipeline":
+        for t in self._threads: t.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        for t in self._threads: t.join(timeout=2)
+
+    def latest(self):
+        """(newest frame, results of the newest recognized frame); results are (box, meta, conf)."""
+        with self._lock:
+            frame = None if self._latest_frame is None else self._latest_frame.copy()
+            return frame, list(self._latest_results)
+
+    def _capture(self):
+        while not self._stop.is_set():
+            with metrics.timer("capture"):
+                ok, frame = self.cap.read()
+            if not ok:
+                time.sleep(0.005); continue
+            with self._lock: self._latest_frame = frame
+            self.frames.put(frame)
+
+    def _detect(self):
+        while not self._stop.is_set():
+            try: frame = self.frames.get(timeout=0.1)
+            except queue.Empty: continue
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            with metrics.timer("detect"):
+                faces = self.gate.detect(gray, self.detector) if self.gate else self.detector.detect(gray)
+            if faces is None:
+                metrics.count("skipped_frames"); continue  # static scene: the latest results still stand
+            self.detections.put((gray, faces))
+
+    def _recognize(self):
+        while not self._stop.is_set():
+            try: gray, faces = self.detections.get(timeout=0.1)
+            except queue.Empty: continue
+            with metrics.timer("recognize"):
+                self._identify(gray, faces)
+
+    def _identify(self, gray, faces):
+        if self.tracker:
+            self.tracker.update(gray, faces)
+            results, identified = identify_tracks(self.tracker, gray, self.matcher, self.label_map, self.threshold)
+            for meta in identified: self._enqueue(meta["person_id"])
+            with self._lock: self._latest_results = results
+            return
+        predictions = self.matcher.predict_batch([gray[y:y+h, x:x+w] for (x,y,w,h) in faces])
+        results = []
+        for box, (label_id, conf) in zip(faces, predictions):
+            meta = self.label_map.get(str(label_id)) or self.label_map.get(label_id)
+            if meta and conf <= self.threshold:
+                results.append((box, meta, conf))
+                self._enqueue(meta["person_id"])
+            else:
+                results.append((box, None, conf))
+        with self._lock: self._latest_results = results
+
+    def _enqueue(self, person_id):
+        if person_id not in self._queued:
+            self._queued.add(person_id)
+            self.marks.put(person_id)
+
+    def _persist(self):
+        while not (self._stop.is_set() and self.marks.empty()):
+            try: person_id = self.marks.get(timeout=0.1)
+            except queue.Empty: continue
+            try:
+                created, msg = self.mark(person_id, self.subject_id)
+            except Exception as e:
+                print(f"[ERROR] Marking {person_id} failed, will retry on next sighting: {e}")
+                self._queued.discard(person_id)
+                continue
+            self.status[person_id] = created
+            if created and self.on_marked: self.on_marked()
@@ -0,0 +1,227 @@
+import argparse, json, queue, threading, time, urllib.request, cv2, numpy as np
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from .detection import FaceDetector
+from .recognize_and_mark import load_model
+
+class MicroBatcher:
+    """Coalesces faces from concurrent requests into one ``predict_batch`` call.
+
+    A batch is sent when it holds ``max_batch`` faces, when its oldest request has waited
+    ``max_delay`` seconds, or as soon as no other request is in flight (callers wrap
+    their whole request in ``active()``), so a lone request is not delayed at all.
+    """
+
+    def __init__(self, matcher, max_batch: int = 32, max_delay: float = 0.005):
+        self.matcher, self.max_batch, self.max_delay = matcher, max_batch, max_delay
+        self.batches = self.faces = 0
+        self._active = 0
+        self._lock = threading.Lock()
+        self._requests = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    @contextmanager
+    def active(self):
+        with self._lock: self._active += 1
+        try:
+            yield
+        finally:
+            with self._lock: self._active -= 1
+
+    def submit(self, faces) -> Future:
+        future = Future()
+        if not faces: future.set_result([])
+        else: self._requests.put((faces, future))
+        return future
+
+    def _run(self):
+        while True:
+            pending = [self._requests.get()]
+            n = len(pending[0][0])
+            deadline = time.perf_counter() + self.max_delay
+            while n < self.max_batch and len(pending) < self._active:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0: break
+                try: item = self._requests.get(timeout=remaining)
+                except queue.Empty: break
+                pending.append(item); n += len(item[0])
+            try:
+                predictions = self.matcher.predict_batch([f for faces, _ in pending for f in faces])
+            except Exception as e:
+                for _, future in pending: future.set_exception(e)
+                continue
+            self.batches += 1; self.faces += n
+            i = 0
+            for faces, future in pending:
+                future.set_result(predictions[i:i + len(faces)]); i += len(faces)
+
+class RecognitionService:
+    """Model, detector and (optionally) attendance writer shared by all request threads."""
+
+    def __init__(self, threshold: float, max_batch: int, max_delay: float, writer=None):
+        self.threshold = threshold
+        self.matcher, self.label_map = load_model(threshold)
+        self.batcher = MicroBatcher(self.matcher, max_batch, max_delay)
+        self.writer = writer
+        self._local = threading.local()
+        self._count_lock = threading.Lock()
+        self.requests = 0
+
+    def _detector(self):
+        detector = getattr(self._local, "detector", None)
+        if detector is None:
+            detector = self._local.detector = FaceDetector()
+        return detector
+
+    def recognize(self, image_bytes: bytes, face: bool = False, subject_id: str = None) -> dict:
+        with self.batcher.active():
+            return self._recognize(image_bytes, face, subject_id)
+
+    def _recognize(self, image_bytes, face, subject_id):
+        gray = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            raise ValueError("Body is not a decodable JPEG/PNG image")
+        if face:
+            boxes = [(0, 0, gray.shape[1], gray.shape[0])]
+        else:
+            boxes = [tuple(int(v) for v in b) for b in self._detector().detect(gray)]
+        predictions = self.batcher.submit([gray[y:y+h, x:x+w] for (x,y,w,h) in boxes]).result()
+        with self._count_lock: self.requests += 1
+        out = []
+        for box, (label_id, conf) in zip(boxes, predictions):
+            meta = self.label_map.get(str(label_id)) or self.label_map.get(label_id)
+            known = bool(meta) and conf <= self.threshold
+            result = {"box": list(box), "label": int(label_id), "confidence": None if label_id < 0 else round(float(conf), 3),
+                      "known": known, "person_id": meta["person_id"] if known else None, "name": meta["name"] if known else None}
+            if subject_id and self.writer:
+                result["marked"], result["message"] = (self.writer.mark(meta["person_id"], subject_id) if known
+                                                       else (False, "Face not recognized"))
+            out.append(result)
+        return {"faces": out}
+
+    def health(self) -> dict:
+        b = self.batcher
+        return {"status": "ok", "samples": len(self.matcher), "requests": self.requests, "batches": b.batches,
+                "faces_per_batch": round(b.faces / b.batches, 2) if b.batches else 0.0}
+
+def make_handler(service: RecognitionService):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, code, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if urlparse(self.path).path == "/health": self._send(200, service.health())
+            else: self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path != "/recognize":
+                self._send(404, {"error": "not found"}); return
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            try:
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            except ValueError:
+                self._send(400, {"error": "Bad Content-Length"}); return
+            subject_id = None
+            if params.get("mark") in ("1", "true"):
+                # Refused outright, so a client never takes a 200 for attendance that was not recorded
+                if not service.writer:
+                    self._send(403, {"error": "Marking is disabled; start the server with --allow-mark"}); return
+                subject_id = params.get("subject_id")
+                if not subject_id:
+                    self._send(400, {"error": "mark=1 needs subject_id"}); return
+            try:
+                result = service.recognize(body, face=params.get("face") in ("1", "true"), subject_id=subject_id)
+            except ValueError as e:
+                self._send(400, {"error": str(e)}); return
+            except Exception as e:
+                print(f"[ERROR] /recognize failed: {type(e).__name__}: {e}")
+                self._send(500, {"error": f"{type(e).__name__}: {e}"}); return
+            self._send(200, result)
+
+        def log_message(self, fmt, *args):
+            pass  # one line per request would dominate the cost of a recognition
+    return Handler
+
+class RecognitionHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # the default backlog of 5 turns bursts into 1s SYN retries
+
+def serve(args):
+    writer = exporter = None
+    if args.allow_mark:
+        from .attendance_db import init_db
+        from .attendance_writer import AttendanceWriter
+        from .auto_export import ExportService
+        init_db()
+        exporter = ExportService().start()
+        writer = AttendanceWriter(on_flush=lambda n: exporter.trigger()).start()
+    service = RecognitionService(args.threshold, args.max_batch, args.max_delay_ms / 1000.0, writer)
+    server = RecognitionHTTPServer((args.host, args.port), make_handler(service))
+    print(f"[OK] Recognition server on http://{args.host}:{args.port} "
+          f"(POST /recognize[?face=1][&mark=1&subject_id=ID], GET /health); Ctrl+C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if writer: writer.close(); exporter.close()
+
+def loadtest(args):
+    with open(args.image, "rb") as f:
+        body = f.read()
+    url = args.url.rstrip("/") + "/recognize" + ("?face=1" if args.face else "")
+    content_type = "image/png" if args.image.lower().endswith(".png") else "image/jpeg"
+
+    def one(_):
+        t = time.perf_counter()
+        req = urllib.request.Request(url, data=body, headers={"Content-Type": content_type})
+        with urllib.request.urlopen(req) as resp:
+            resp.read()
+        return time.perf_counter() - t
+
+    one(0)  # warm-up
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        latencies = np.array(list(pool.map(one, range(args.requests))))
+    elapsed = time.perf_counter() - t0
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f"[BENCH] {args.requests} requests, concurrency {args.concurrency}: {args.requests / elapsed:.1f} req/s, "
+          f"p50 {p50:.1f} ms, p99 {p99:.1f} ms")
+    with urllib.request.urlopen(args.url.rstrip("/") + "/health") as resp:
+        print(f"[INFO] Server: {json.loads(resp.read())}")
+
+def main():
+    p = argparse.ArgumentParser(description="Local face recognition server with request batching")
+    sub = p.add_subparsers(dest="command", required=True)
+    s = sub.add_parser("serve", help="Run the server")
+    s.add_argument("--host", default="127.0.0.1")
+    s.add_argument("--port", type=int, default=8765)
+    s.add_argument("--threshold", type=float, default=70.0)
+    s.add_argument("--max-batch", type=int, default=32, help="Faces per recognition batch")
+    s.add_argument("--max-delay-ms", type=float, default=5.0, help="Longest a request waits for its batch to fill")
+    s.add_argument("--allow-mark", action="store_true", help="Honour mark=1&subject_id=... by marking attendance")
+    s.set_defaults(func=serve)
+    t = sub.add_parser("loadtest", help="Send concurrent requests and report latency and throughput")
+    t.add_argument("image", help="JPEG/PNG to send")
+    t.add_argument("--url", default="http://127.0.0.1:8765")
+    t.add_argument("--face", action="store_true", help="The image is a pre-cropped face")
+    t.add_argument("--concurrency", type=int, default=8)
+    t.add_argument("--requests", type=int, default=500)
+    t.set_defaults(func=loadtest)
+    args = p.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,19 @@
 import argparse, cv2
-from pathlib import Path
-from .config import DATASET_DIR
+from .config import DATASET_DIR, DETECT_FACE_PX
 from .attendance_db import init_db, upsert_student
+from .detection import FaceDetector, parse_roi
 
-CASCADE_PATH = str(Path(__file__).resolve().parent.parent / "haarcascade_frontalface_default.xml")
-
-def main():
+def main(argv=None):
     p = argparse.ArgumentParser()
     p.add_argument("--person-id", required=True)
     p.add_argument("--name", required=True)
     p.add_argument("--max-samples", type=int, default=50)
     p.add_argument("--camera-index", type=int, default=0)
-    args = p.parse_args()
+    p.add_argument("--roi", type=parse_roi, action="append", help="Only detect faces inside x,y,w,h (frame pixels)")
+    p.add_argument("--detect-face-px", type=int, default=DETECT_FACE_PX,
+                   help="Downscale frames so a 100px face is this big before detecting (faster, may miss faces); "
+                        "0 = full resolution (default)")
+    args = p.parse_args(argv)
 
     init_db()
     upsert_student(args.person_id, args.name)
@@ -23,7 +25,7 @@ def main():
     if not cap.isOpened():
         print(f"[ERROR] Cannot open camera index {args.camera_index}")
         return
-    detector = cv2.CascadeClassifier(CASCADE_PATH)
+    detector = FaceDetector(face_px=args.detect_face_px, rois=args.roi)
 
     print("[INFO] SPACE=capture  Q=quit")
     count = 0
@@ -31,7 +33,7 @@ def main():
         ok, frame = cap.read()
         if not ok: continue
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = detector.detectMultiScale(gray, 1.1, 5, minSize=(100,100))
+        faces = detector.detect(gray)
         for (x,y,w,h) in faces:
             cv2.rectangle(frame, (x,y), (x+w,y+h), (255,255,255), 2)
         cv2.imshow("Register", frame)
@@ -0,0 +1,156 @@
+from __future__ import annotations
+import itertools, cv2, numpy as np
+from collections import Counter
+from typing import List, Optional, Sequence
+
+UNKNOWN = -1
+
+def iou(a, b) -> float:
+    ax, ay, aw, ah = a; bx, by, bw, bh = b
+    iw = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    ih = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = iw * ih
+    union = aw * ah + bw * bh - inter
+    return inter / union if union else 0.0
+
+class Track:
+    """One face followed across frames; identified once by voting over its first predictions."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, box):
+        self.id = next(self._ids)
+        self.box = tuple(int(v) for v in box)
+        self.votes = []        # (label or UNKNOWN, conf) per recognized frame
+        self.label: Optional[int] = None  # decided label, UNKNOWN, or None while voting
+        self.conf: Optional[float] = None
+        self.misses = 0
+        self.since_decided = 0
+        self.points = None     # KLT feature points inside the box
+
+    @property
+    def decided(self) -> bool:
+        return self.label is not None
+
+    def vote(self, label: int, conf: float, threshold: float, vote_frames: int) -> bool:
+        """Add one prediction; returns True when this vote decides the track's identity."""
+        self.votes.append((label if conf <= threshold else UNKNOWN, conf))
+        if len(self.votes) < vote_frames: return False
+        winner, n = Counter(l for l, _ in self.votes).most_common(1)[0]
+        if winner != UNKNOWN and n * 2 > len(self.votes):
+            self.label = winner
+            self.conf = float(np.median([c for l, c in self.votes if l == winner]))
+        else:
+            self.label, self.conf = UNKNOWN, None
+        self.votes = []; self.since_decided = 0
+        return True
+
+class FaceTracker:
+    """IoU/centroid multi-face tracker, with optional KLT optical flow between detections.
+
+    ``update`` takes the frame's detections, or None on frames where detection was
+    skipped, in which case boxes are moved by the median optical flow of their points.
+    Tracks that vote Unknown are voted again after ``retry_frames`` frames.
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, max_misses: int = 10, vote_frames: int = 5,
+                 retry_frames: int = 30):
+        self.iou_threshold, self.max_misses = iou_threshold, max_misses
+        self.vote_frames, self.retry_frames = vote_frames, retry_frames
+        self.tracks: List[Track] = []
+        self._prev_gray = None
+
+    def _associate(self, boxes) -> dict:
+        pairs = sorted(((iou(t.box, b), ti, bi) for ti, t in enumerate(self.tracks) for bi, b in enumerate(boxes)),
+                       reverse=True)
+        matched, used_t, used_b = {}, set(), set()
+        for score, ti, bi in pairs:
+            if score < self.iou_threshold: break
+            if ti in used_t or bi in used_b: continue
+            matched[bi] = ti; used_t.add(ti); used_b.add(bi)
+        # Fast movers with little overlap: nearest centre within half a face width
+        for bi, b in enumerate(boxes):
+            if bi in used_b: continue
+            cx, cy = b[0] + b[2] / 2, b[1] + b[3] / 2
+            best, best_d = None, 0.5 * max(b[2], b[3])
+            for ti, t in enumerate(self.tracks):
+                if ti in used_t: continue
+                d = np.hypot(t.box[0] + t.box[2] / 2 - cx, t.box[1] + t.box[3] / 2 - cy)
+                if d < best_d: best, best_d = ti, d
+            if best is not None:
+                matched[bi] = best; used_t.add(best); used_b.add(bi)
+        return matched
+
+    def _flow(self, gray) -> None:
+        for t in self.tracks:
+            if self._prev_gray is None: break
+            if t.points is None or len(t.points) < 3:
+                t.misses += 1; continue
+            nxt, st, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, t.points, None)
+            good = st.ravel() == 1
+            if good.sum() < 3:
+                t.misses += 1; t.points = None; continue
+            dx, dy = np.median((nxt[good] - t.points[good]).reshape(-1, 2), axis=0)
+            x, y, w, h = t.box
+            t.box = (int(round(x + dx)), int(round(y + dy)), w, h)
+            t.points = nxt[good].reshape(-1, 1, 2)
+
+    def _seed_points(self, gray, t: Track) -> None:
+        x, y, w, h = t.box
+        mask = np.zeros_like(gray)
+        mask[max(y, 0):y + h, max(x, 0):x + w] = 255
+        t.points = cv2.goodFeaturesToTrack(gray, 30, 0.01, 5, mask=mask)
+
+    def update(self, gray, boxes: Optional[Sequence] = None, use_flow: bool = False) -> List[Track]:
+        if boxes is None:
+            if use_flow: self._flow(gray)
+        else:
+            matched = self._associate(boxes)
+            hit = set(matched.values())
+            for ti, t in enumerate(self.tracks):
+                if ti not in hit: t.misses += 1
+            for bi, b in enumerate(boxes):
+                if bi in matched:
+                    t = self.tracks[matched[bi]]
+                    t.box = tuple(int(v) for v in b); t.misses = 0
+                else:
+                    t = Track(b); self.tracks.append(t)
+                if use_flow: self._seed_points(gray, t)
+        self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+        for t in self.tracks:
+            if t.label == UNKNOWN:
+                t.since_decided += 1
+                if t.since_decided >= self.retry_frames: t.label = None
+        self._prev_gray = gray
+        return self.tracks
+
+    def needs_recognition(self) -> List[Track]:
+        """Live tracks still voting (including Unknown tracks due for a retry)."""
+        return [t for t in self.tracks if not t.decided and t.misses == 0]
+
+def crop(gray, box):
+    x, y, w, h = box
+    return gray[max(y, 0):max(y + h, 0), max(x, 0):max(x + w, 0)]
+
+def identify_tracks(tracker: FaceTracker, gray, matcher, label_map, threshold, vote: bool = True):
+    """Recognize the tracks still voting; returns ((box, meta, conf) results, metas identified this frame).
+
+    Tracks still voting are reported with meta and conf both None. ``vote`` False only reports the
+    tracks, e.g. on a static frame whose crops would just repeat the last votes.
+    """
+    pending = [t for t in tracker.needs_recognition() if crop(gray, t.box).size] if vote else []
+    predictions = matcher.predict_batch([crop(gray, t.box) for t in pending])
+    identified = []
+    for t, (label_id, conf) in zip(pending, predictions):
+        if t.vote(label_id, conf, threshold, tracker.vote_frames) and t.label != UNKNOWN:
+            meta = label_map.get(str(t.label)) or label_map.get(t.label)
+            if meta: identified.append(meta)
+    results = []
+    for t in tracker.tracks:
+        if t.misses: continue
+        if not t.decided:
+            results.append((t.box, None, None))
+        else:
+            meta = (label_map.get(str(t.label)) or label_map.get(t.label)) if t.label != UNKNOWN else None
+            results.append((t.box, meta, t.conf if meta else 0.0))
+    return results, identified
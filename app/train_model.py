@@ -1,49 +1,241 @@
-import json, cv2, numpy as np
-from pathlib import Path
-from .config import DATASET_DIR, MODELS_DIR
+import argparse, json, os, shutil, time, cv2, numpy as np
+from datetime import datetime
+from contextlib import contextmanager
+from multiprocessing import Pool
+from .config import BASE_DATA_DIR, DATASET_DIR, MODELS_DIR, TRAIN_WORKERS, CROP_CACHE_MAX_MB, DETECTOR_BACKEND
+from .crop_cache import CropCache
+from .detection import FaceDetector, model_path
+from .matcher import BatchLBPHMatcher
 
-CASCADE_PATH = str(Path(__file__).resolve().parent.parent / "haarcascade_frontalface_default.xml")
+MODEL_PATH = MODELS_DIR / "lbph_model.yml"
+# Same model for recognition, memory-mapped at startup (the YAML stays the training state)
+BINARY_MODEL_PATH = MODELS_DIR / "lbph_model.npz"
+LABELS_PATH = MODELS_DIR / "labels.json"
+# Per-folder label and file fingerprints from the last training run, used by --incremental
+MANIFEST_PATH = MODELS_DIR / "train_manifest.json"
+CROP_CACHE_DIR = MODELS_DIR / "crop_cache"
+# --remove moves a person's photos here instead of deleting them
+REMOVED_DIR = BASE_DATA_DIR / "removed_dataset"
+# Training photos are searched at full resolution over the whole image
+DETECT_PARAMS = {"scale_factor": 1.1, "min_neighbors": 5, "min_face": 80, "face_px": None, "rois": []}
 
-def main():
-    image_paths, labels = [], []
-    label_map, idx = {}, 0
+def scan_dataset():
+    """Map each valid person folder name to its person_id, name and sorted image paths."""
+    folders = {}
     for person_folder in sorted(DATASET_DIR.glob("*")):
         if not person_folder.is_dir(): continue
         parts = person_folder.name.split("_",1)
-        if len(parts)!=2: 
-            print(f"[SKIP] {person_folder.name}"); 
+        if len(parts)!=2:
+            print(f"[SKIP] {person_folder.name}");
             continue
-        person_id, name = parts[0], parts[1].replace("_"," ")
-        label_map[idx] = {"person_id": person_id, "name": name}
-        for img in sorted(person_folder.glob("*.png")):
-            image_paths.append(img); labels.append(idx)
-        idx += 1
+        folders[person_folder.name] = {
+            "person_id": parts[0], "name": parts[1].replace("_"," "),
+            "images": sorted(person_folder.glob("*.png")),
+        }
+    return folders
 
-    if not image_paths:
-        raise RuntimeError("No images found. Run register_faces.py first.")
+def _fingerprint(images):
+    return {p.name: [p.stat().st_size, p.stat().st_mtime_ns] for p in images}
+
+@contextmanager
+def stage(name, n_images=None):
+    t0 = time.perf_counter()
+    yield
+    dt = time.perf_counter() - t0
+    rate = f" ({n_images/dt:.1f} img/s)" if n_images and dt > 0 else ""
+    print(f"[TIME] {name}: {dt:.2f}s{rate}")
+
+# One detector per process, loaded on first use (pool workers build their own)
+_detector = None
+
+def load_face(img_path):
+    """Read one training image and return its largest detected face (or the whole image), None if unreadable."""
+    global _detector
+    if _detector is None:
+        _detector = FaceDetector(DETECTOR_BACKEND, **DETECT_PARAMS)
+    img = cv2.imread(str(img_path), cv2.IMREAD_GRAYSCALE)
+    if img is None: return None
+    det = _detector.detect(img)
+    if len(det)>0:
+        (x,y1,w,h) = sorted(det, key=lambda b:b[2]*b[3], reverse=True)[0]
+        return img[y1:y1+h, x:x+w]
+    return img
+
+def open_crop_cache():
+    sig = CropCache.signature(str(model_path(DETECTOR_BACKEND)), backend=DETECTOR_BACKEND, **DETECT_PARAMS)
+    return CropCache(CROP_CACHE_DIR, sig, CROP_CACHE_MAX_MB * 2**20)
 
-    detector = cv2.CascadeClassifier(CASCADE_PATH)
+def extract_faces(image_paths, labels, workers=1, cache=None):
+    """Load and detect faces, in input order, across ``workers`` processes.
+
+    With a ``cache``, images it already holds a crop for skip loading and detection.
+    """
+    loaded = [cache.get(p) for p in image_paths] if cache else [None] * len(image_paths)
+    todo = [i for i, face in enumerate(loaded) if face is None]
+    paths = [image_paths[i] for i in todo]
+    if workers > 1 and len(paths) > 1:
+        # Pool.imap keeps input order, so the model matches a serial run byte for byte
+        chunksize = max(1, len(paths) // (workers * 4))
+        with Pool(min(workers, len(paths))) as pool:
+            detected = list(pool.imap(load_face, paths, chunksize=chunksize))
+    else:
+        detected = [load_face(p) for p in paths]
+    for i, face in zip(todo, detected):
+        loaded[i] = face
+        if cache and face is not None: cache.put(image_paths[i], face)
+    if cache:
+        cache.save()
+        print(f"[CACHE] {cache.hits} hits, {cache.misses} misses, {cache.evicted} evicted")
     faces, y = [], []
-    for img_path, lbl in zip(image_paths, labels):
-        img = cv2.imread(str(img_path), cv2.IMREAD_GRAYSCALE)
-        if img is None: continue
-        det = detector.detectMultiScale(img, 1.1, 5, minSize=(80,80))
-        if len(det)>0:
-            (x,y1,w,h) = sorted(det, key=lambda b:b[2]*b[3], reverse=True)[0]
-            face = img[y1:y1+h, x:x+w]
-        else:
-            face = img
+    for face, lbl in zip(loaded, labels):
+        if face is None: continue
         faces.append(face); y.append(lbl)
+    return faces, y
 
-    if not faces: raise RuntimeError("No faces detected for training.")
+def _folder_samples(folders, labels_by_folder):
+    image_paths, labels = [], []
+    for folder, lbl in labels_by_folder.items():
+        for img in folders[folder]["images"]:
+            image_paths.append(img); labels.append(lbl)
+    return image_paths, labels
+
+def write_lbph(path, recognizer, histograms, labels):
+    """Save an LBPH model from raw histograms, in the same layout as ``recognizer.save``."""
+    fs = cv2.FileStorage(str(path), cv2.FILE_STORAGE_WRITE)
+    fs.startWriteStruct("opencv_lbphfaces", cv2.FILE_NODE_MAP)
+    fs.write("threshold", recognizer.getThreshold())
+    fs.write("radius", recognizer.getRadius())
+    fs.write("neighbors", recognizer.getNeighbors())
+    fs.write("grid_x", recognizer.getGridX())
+    fs.write("grid_y", recognizer.getGridY())
+    fs.startWriteStruct("histograms", cv2.FILE_NODE_SEQ)
+    for h in histograms: fs.write("", h)
+    fs.endWriteStruct()
+    fs.write("labels", np.asarray(labels, dtype=np.int32).reshape(-1, 1))
+    fs.startWriteStruct("labelsInfo", cv2.FILE_NODE_SEQ)
+    fs.endWriteStruct()
+    fs.endWriteStruct()
+    fs.release()
 
-    recognizer = cv2.face.LBPHFaceRecognizer_create(radius=1, neighbors=8, grid_x=8, grid_y=8)
-    recognizer.train(faces, np.array(y))
+def _tmp(path):
+    # Keeps the suffix: FileStorage picks YAML or XML from it
+    return path.with_name(f"{path.stem}.tmp{path.suffix}")
+
+def _save(recognizer, label_map, manifest):
+    """The only place the model files change. Everything is written under temporary names and then
+    swapped in; the binary model goes last, so it is never older than the YAML it matches."""
     MODELS_DIR.mkdir(parents=True, exist_ok=True)
-    recognizer.save(str(MODELS_DIR / "lbph_model.yml"))
-    with open(MODELS_DIR / "labels.json", "w", encoding="utf-8") as f:
-        json.dump(label_map, f, indent=2)
+    recognizer.save(str(_tmp(MODEL_PATH)))
+    for path, data in ((LABELS_PATH, label_map), (MANIFEST_PATH, manifest)):
+        with open(_tmp(path), "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+    for path in (LABELS_PATH, MANIFEST_PATH, MODEL_PATH):
+        os.replace(_tmp(path), path)
+    BatchLBPHMatcher.from_recognizer(recognizer).save(BINARY_MODEL_PATH)
     print("[OK] Model saved.")
 
+def train_full(folders, workers=1, cache=None):
+    labels_by_folder = {folder: idx for idx, folder in enumerate(folders)}
+    label_map = {idx: {"person_id": folders[f]["person_id"], "name": folders[f]["name"]} for f, idx in labels_by_folder.items()}
+    image_paths, labels = _folder_samples(folders, labels_by_folder)
+    if not image_paths:
+        raise RuntimeError("No images found. Run register_faces.py first.")
+
+    with stage(f"load+detect, {workers} worker(s)", len(image_paths)):
+        faces, y = extract_faces(image_paths, labels, workers, cache)
+    if not faces: raise RuntimeError("No faces detected for training.")
+
+    with stage("train", len(faces)):
+        recognizer = cv2.face.LBPHFaceRecognizer_create(radius=1, neighbors=8, grid_x=8, grid_y=8)
+        recognizer.train(faces, np.array(y))
+    manifest = {f: {"label": lbl, "files": _fingerprint(folders[f]["images"])} for f, lbl in labels_by_folder.items()}
+    with stage("save"):
+        _save(recognizer, label_map, manifest)
+
+def train_incremental(folders, workers=1, cache=None):
+    """Add new person folders and refresh changed or deleted ones, keeping every other label as is."""
+    if not (MODEL_PATH.exists() and LABELS_PATH.exists() and MANIFEST_PATH.exists()):
+        print("[INFO] No previous incremental state, running full training.")
+        return train_full(folders, workers, cache)
+
+    with open(LABELS_PATH, "r", encoding="utf-8") as f:
+        label_map = {int(k): v for k, v in json.load(f).items()}
+    with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    current = {f: _fingerprint(info["images"]) for f, info in folders.items()}
+    removed = [f for f in manifest if f not in current]
+    changed = [f for f in manifest if f in current and current[f] != manifest[f]["files"]]
+    added = [f for f in current if f not in manifest]
+    if not (removed or changed or added):
+        print("[OK] Model is up to date.")
+        return
+
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.read(str(MODEL_PATH))
+    drop = {manifest[f]["label"] for f in removed + changed}
+    if drop:
+        hists, labels = recognizer.getHistograms(), recognizer.getLabels().ravel()
+        keep = [i for i, lbl in enumerate(labels) if int(lbl) not in drop]
+        # Rebuilt through a scratch file: the saved model must not change unless _save runs
+        reduced = MODELS_DIR / "lbph_model.reduced.yml"
+        write_lbph(reduced, recognizer, [hists[i] for i in keep], labels[keep])
+        # read() appends histograms to what an instance already holds, so load into a fresh one
+        recognizer = cv2.face.LBPHFaceRecognizer_create()
+        recognizer.read(str(reduced))
+        reduced.unlink()
+    for f in removed:
+        label_map.pop(manifest.pop(f)["label"], None)
+
+    next_label = max([*label_map, *(m["label"] for m in manifest.values()), -1]) + 1
+    for f in added:
+        manifest[f] = {"label": next_label}; next_label += 1
+    for f in changed + added:
+        lbl = manifest[f]["label"]
+        manifest[f]["files"] = current[f]
+        label_map[lbl] = {"person_id": folders[f]["person_id"], "name": folders[f]["name"]}
+
+    image_paths, labels = _folder_samples(folders, {f: manifest[f]["label"] for f in changed + added})
+    with stage(f"load+detect, {workers} worker(s)", len(image_paths)):
+        faces, y = extract_faces(image_paths, labels, workers, cache)
+    if faces:
+        with stage("update", len(faces)):
+            recognizer.update(faces, np.array(y))
+    if not len(recognizer.getHistograms()):
+        raise RuntimeError("No faces detected for training.")
+    print(f"[INFO] Added {len(added)}, refreshed {len(changed)}, removed {len(removed)} person folder(s); "
+          f"{len(faces)} new samples.")
+    with stage("save"):
+        _save(recognizer, dict(sorted(label_map.items())), manifest)
+
+def remove_person(person_id, workers=1, cache=None):
+    """Move a person's dataset folders to REMOVED_DIR and drop their samples from the model."""
+    targets = [p for p in DATASET_DIR.glob(f"{person_id}_*") if p.is_dir() and p.name.split("_",1)[0] == person_id]
+    if not targets:
+        raise RuntimeError(f"No dataset folder for person {person_id}")
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    for p in targets:
+        dest = REMOVED_DIR / stamp / p.name
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(str(p), str(dest))
+        print(f"[REMOVED] {p} (photos kept in {dest}; move the folder back to restore)")
+    train_incremental(scan_dataset(), workers, cache)
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Train the LBPH face model")
+    p.add_argument("--incremental", action="store_true", help="Only train new, changed or deleted person folders")
+    p.add_argument("--remove", metavar="PERSON_ID", help="Remove a person from the model; their photos move to removed_dataset/")
+    p.add_argument("--workers", type=int, default=TRAIN_WORKERS, help="Processes for image loading and face detection")
+    p.add_argument("--no-cache", action="store_true", help="Detect faces in every image, ignoring the crop cache")
+    args = p.parse_args(argv)
+
+    workers = max(1, args.workers)
+    cache = None if args.no_cache else open_crop_cache()
+    with stage("scan"):
+        folders = scan_dataset()
+    if args.remove: remove_person(args.remove, workers, cache)
+    elif args.incremental: train_incremental(folders, workers, cache)
+    else: train_full(folders, workers, cache)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,140 @@
+"""A long-lived process that runs training, face registration and recognition for the GUI.
+
+Launching ``python -m app.<script>`` per action re-imported cv2 and numpy and reloaded the
+model every time. The worker pays for that once, in the background, while the GUI starts.
+The GUI then sends ``(task_id, script, argv)`` over a queue and reads events back:
+
+    ("ready", None, seconds)       imports and model warm
+    ("started", task_id, None)
+    ("line", task_id, text)        each line the task prints: its progress
+    ("done", task_id, None) or ("error", task_id, message)
+
+Tasks run one at a time, in the worker's main thread (OpenCV windows need it).
+"""
+import importlib, multiprocessing as mp, queue, sys, time
+from . import metrics
+from .config import METRICS_ENABLED
+
+TASKS = ("train_model", "register_faces", "recognize_and_mark")
+WARM = "warm"  # built-in task: the warm-up again, instant once warm; used to measure launch latency
+
+class _Lines:
+    """stdout/stderr replacement forwarding each printed line as an event (and still printing it)."""
+
+    def __init__(self, events, task_id, stream):
+        self.events, self.task_id, self.stream = events, task_id, stream
+        self._buf = ""
+
+    def write(self, s):
+        self.stream.write(s)
+        self._buf += s
+        *lines, self._buf = self._buf.split("\n")
+        for line in lines:
+            if line.strip(): self.events.put(("line", self.task_id, line))
+        return len(s)
+
+    def flush(self):
+        self.stream.flush()
+
+def warm_up():
+    """Import what the tasks use and page in the binary model, so the next task starts at once."""
+    for name in TASKS: importlib.import_module(f"{__package__}.{name}")
+    from .recognize_and_mark import load_model, model_file
+    path = model_file()
+    if path and path.suffix == ".npz":  # a YAML model would take seconds to parse only to be thrown away
+        matcher, _ = load_model(70.0)
+        matcher.lower_bounds(matcher.histograms[:1])
+
+def _run(task_id, script, argv, events):
+    stdout, stderr, sys_argv = sys.stdout, sys.stderr, sys.argv
+    sys.stdout, sys.stderr = _Lines(events, task_id, stdout), _Lines(events, task_id, stderr)
+    sys.argv = [f"python -m {__package__}.{script}", *argv]  # argparse takes the program name from here
+    # A previous task's --metrics must not keep timing this one or leak its samples into it
+    metrics.reset(); metrics.enable(METRICS_ENABLED)
+    try:
+        if script == WARM: warm_up()
+        else: importlib.import_module(f"{__package__}.{script}").main(argv)
+        return ("done", task_id, None)
+    except SystemExit as e:  # argparse usage errors and --help
+        return ("done", task_id, None) if not e.code else ("error", task_id, f"exited with status {e.code}")
+    except Exception as e:
+        return ("error", task_id, f"{type(e).__name__}: {e}")
+    finally:
+        sys.stdout, sys.stderr, sys.argv = stdout, stderr, sys_argv
+
+def _serve(tasks, events):
+    t0 = time.perf_counter()
+    try: warm_up()
+    except Exception as e: print(f"[ERROR] Worker warm-up failed: {e}")
+    events.put(("ready", None, time.perf_counter() - t0))
+    while True:
+        item = tasks.get()
+        if item is None: break
+        task_id, script, argv = item
+        events.put(("started", task_id, None))
+        events.put(_run(task_id, script, argv, events))
+
+class TaskWorker:
+    """GUI-side handle on the worker process. ``submit`` queues a task; ``events`` drains
+    progress without blocking, so a Tk ``after`` loop can poll it. If the process dies
+    (e.g. a crash inside OpenCV), its unfinished tasks are reported as errors and the next
+    ``submit`` starts a fresh worker."""
+
+    def __init__(self):
+        # Spawned, not forked: the GUI process holds Tk and open DB connections
+        self._ctx = mp.get_context("spawn")
+        self._next_id = 0
+        self.pending = set()
+        self._new_process()
+
+    def _new_process(self):
+        self._tasks, self._events = self._ctx.Queue(), self._ctx.Queue()
+        # Not a daemon: training starts its own pool of processes
+        self.process = self._ctx.Process(target=_serve, args=(self._tasks, self._events), name="attendance-worker")
+
+    def start(self) -> "TaskWorker":
+        self.process.start()
+        return self
+
+    def submit(self, script: str, *argv) -> int:
+        if script != WARM and script not in TASKS:
+            raise ValueError(f"Unknown task {script!r}; choose from {', '.join(TASKS)}")
+        if self.process.exitcode is not None:
+            self._new_process(); self.start()
+        self._next_id += 1
+        self.pending.add(self._next_id)
+        self._tasks.put((self._next_id, script, [str(a) for a in argv]))
+        return self._next_id
+
+    def events(self):
+        """Events received since the last call."""
+        out = []
+        while True:
+            try: event = self._events.get_nowait()
+            except queue.Empty: break
+            if event[0] in ("done", "error"): self.pending.discard(event[1])
+            out.append(event)
+        if self.process.exitcode is not None and self.pending and not out:
+            out = [("error", task_id, f"worker process exited (code {self.process.exitcode})")
+                   for task_id in sorted(self.pending)]
+            self.pending.clear()
+        return out
+
+    def wait(self, task_id: int, timeout: float = None):
+        """Block until ``task_id`` finishes; returns its final event (used by scripts and benchmarks)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try: event = self._events.get(timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                raise TimeoutError(f"Task {task_id} still running after {timeout}s")
+            if event[0] in ("done", "error"):
+                self.pending.discard(event[1])
+                if event[1] == task_id: return event
+
+    def close(self, timeout: float = 2.0) -> None:
+        """Ask the worker to exit after its current task; a task still running (a camera loop
+        waiting for Q) after ``timeout`` seconds is terminated."""
+        if self.process.is_alive():
+            self._tasks.put(None)
+            self.process.join(timeout)
+        if self.process.is_alive(): self.process.terminate()
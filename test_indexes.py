@@ -0,0 +1,71 @@
+"""Checks that migrations build the read-path indexes and that the hot queries use them.
+
+Runs against a throwaway SQLite database: python -m pytest test_indexes.py
+"""
+import os, tempfile
+from datetime import date
+
+os.environ["ATTENDANCE_DB_BACKEND"] = "sqlite"
+os.environ["ATTENDANCE_SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(), "attendance.db")
+
+from app import attendance_db as db
+
+db.init_db()
+
+def query_plan(call):
+    """Run ``call`` and return the EXPLAIN QUERY PLAN details of every SELECT it executed."""
+    executed = []
+    make_cursor = db.BACKEND.cursor
+
+    class Recorder:
+        def __init__(self, cursor): self._cursor = cursor
+        def execute(self, query, params=()):
+            executed.append((query, params))
+            return self._cursor.execute(query, params)
+        def __getattr__(self, name): return getattr(self._cursor, name)
+
+    db.BACKEND.cursor = lambda conn: Recorder(make_cursor(conn))
+    try:
+        call()
+    finally:
+        db.BACKEND.cursor = make_cursor
+    plan = []
+    with db.session() as cursor:
+        for query, params in executed:
+            if query.lstrip().upper().startswith("SELECT"):
+                cursor.execute(db.BACKEND.explain + query, params)
+                plan += [row[-1] for row in cursor.fetchall()]
+    return plan
+
+def recount():
+    with db.session() as cursor:
+        db._stats_recount(cursor, [("s1", "m1", date.today())])
+
+HOT_QUERIES = {
+    "list_attendance": (lambda: db.list_attendance(), "idx_attendance_ts"),
+    "list_attendance_by_person": (lambda: db.list_attendance_by_person("s1"), "idx_attendance_person_ts"),
+    "list_marked_on": (lambda: db.list_marked_on(date.today()), "idx_attendance_day"),
+    "list_queries": (lambda: db.list_queries(), "idx_queries_ts"),
+    "subject_day_count": (recount, "idx_attendance_subject_day"),
+}
+
+def test_migrations_applied_once():
+    assert db.schema_version() == max(version for version, _, _ in db.MIGRATIONS)
+    assert db.migrate() == []
+
+def test_hot_queries_use_indexes():
+    for name, (call, index) in HOT_QUERIES.items():
+        plan = query_plan(call)
+        assert any(index in step for step in plan), f"{name} does not use {index}: {plan}"
+
+def test_no_full_scans_on_attendance():
+    for name, (call, _) in HOT_QUERIES.items():
+        for step in query_plan(call):
+            full_scan = step.split()[:2] in (["SCAN", "a"], ["SCAN", "attendance"]) and "INDEX" not in step
+            assert not full_scan, f"{name} scans attendance: {step}"
+
+if __name__ == "__main__":
+    test_migrations_applied_once()
+    test_hot_queries_use_indexes()
+    test_no_full_scans_on_attendance()
+    print("[OK] Hot queries use their indexes")
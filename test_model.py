@@ -1,16 +1,22 @@
 import json, cv2
 from pathlib import Path
+from app.matcher import BatchLBPHMatcher
 
 MODELS_DIR = Path('app/data/models')
 model_path = MODELS_DIR / "lbph_model.yml"
+binary_path = MODELS_DIR / "lbph_model.npz"
 labels_path = MODELS_DIR / "labels.json"
 
-if not (model_path.exists() and labels_path.exists()):
+if not ((binary_path.exists() or model_path.exists()) and labels_path.exists()):
     print("Model files not found.")
 else:
-    recognizer = cv2.face.LBPHFaceRecognizer_create()
-    recognizer.read(str(model_path))
+    if binary_path.exists():
+        matcher = BatchLBPHMatcher.load(binary_path)
+    else:
+        recognizer = cv2.face.LBPHFaceRecognizer_create()
+        recognizer.read(str(model_path))
+        matcher = BatchLBPHMatcher.from_recognizer(recognizer)
     with open(labels_path, "r", encoding="utf-8") as f:
         label_map = json.load(f)
-    print("Model loaded successfully.")
+    print(f"Model loaded successfully ({len(matcher)} samples).")
     print("Labels:", label_map)